@@ -0,0 +1,269 @@
+"""
+Transcribe a directory of recorded meetings offline, without the live recorder.
+
+Each file is cut into speech chunks the same way live audio is, the chunks are
+transcribed across a pool of processes, and every finished file is written as
+one session (chunks, word timings, speakers and a transcript file) in a single
+transaction. Finished files are remembered, so an interrupted run picks up
+where it stopped.
+
+    python batch_transcribe.py recordings/
+    python batch_transcribe.py recordings/ --workers 4 --piece-duration 120
+"""
+import argparse
+import collections
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+import soundfile as sf
+from utils.audio_utils import log_message, StreamingResampler
+from services.vad import SpeechSegmenter
+from services.audio_archiver import AudioArchiver
+from services.speaker_diarization import SpeakerDiarizer
+from database.db_utils import init_database
+from config import DB_PATH, ASR_SAMPLE_RATE, DEFAULT_SPEAKER_THRESHOLD, MODEL_SIZE, RETAIN_AUDIO, LANGUAGE
+
+# Whisper model of each pool process, loaded once by _init_worker
+worker_model = None
+
+def _init_worker(cpu_threads, device_indices):
+    """Load the Whisper model in a pool process, on the next free GPU if there are any."""
+    global worker_model
+    from services.transcription import load_whisper_model
+    worker_model = load_whisper_model(MODEL_SIZE, num_workers=1, cpu_threads=cpu_threads,
+                                      device_index=device_indices.get())
+
+def _transcribe_piece(audios):
+    """Transcribe one piece (a list of 16 kHz chunks) in a pool process.
+
+    Returns (segment texts, word tuples) per chunk.
+    """
+    from services.transcription import DECODE_OPTIONS, is_speech
+    options = dict(DECODE_OPTIONS, language=LANGUAGE) if LANGUAGE else DECODE_OPTIONS
+
+    results = []
+    for audio in audios:
+        segments, info = worker_model.transcribe(audio, **options)
+        segment_texts = []
+        words = []
+        for segment in segments:
+            if not is_speech(segment):
+                continue
+            segment_texts.append(segment.text.strip())
+            words.extend((w.word, w.start, w.end, w.probability) for w in segment.words or [])
+        results.append((segment_texts, words))
+    return results
+
+def find_audio_files(directory):
+    """All files under directory that libsndfile can read, in a stable order."""
+    extensions = {f".{name.lower()}" for name in sf.available_formats()}
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in extensions:
+                paths.append(os.path.abspath(os.path.join(root, name)))
+    return sorted(paths)
+
+def finished_files():
+    """Paths already transcribed by earlier runs."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT path FROM batch_files")
+    paths = {row[0] for row in cursor.fetchall()}
+    conn.close()
+    return paths
+
+def split_file(path):
+    """Cut a file into speech chunks like the live recorder does.
+
+    Returns a list of (16 kHz audio, start position in samples).
+    """
+    info = sf.info(path)
+    resampler = StreamingResampler(info.samplerate, ASR_SAMPLE_RATE)
+    segmenter = SpeechSegmenter(ASR_SAMPLE_RATE, DEFAULT_SPEAKER_THRESHOLD)
+
+    chunks = []
+    for block in sf.blocks(path, blocksize=info.samplerate * 10, dtype="float32", always_2d=True):
+        samples = resampler.process(block.mean(axis=1))
+        chunks.extend((audio, start) for audio, start, _ in segmenter.feed(samples))
+    chunks.extend((audio, start) for audio, start, _ in segmenter.flush())
+    return chunks
+
+def group_pieces(chunks, piece_duration):
+    """Group consecutive chunks into pieces of about piece_duration seconds each."""
+    pieces = []
+    current = []
+    current_frames = 0
+    for audio, _ in chunks:
+        if current and current_frames + len(audio) > piece_duration * ASR_SAMPLE_RATE:
+            pieces.append(current)
+            current, current_frames = [], 0
+        current.append(audio)
+        current_frames += len(audio)
+    if current:
+        pieces.append(current)
+    return pieces
+
+def _format_offset(seconds):
+    """Position in the recording as HH:MM:SS."""
+    return time.strftime("%H:%M:%S", time.gmtime(seconds))
+
+def commit_file(path, chunks, results):
+    """Write one transcribed file as a session, in a single transaction."""
+    from services.transcription import word_offsets, WordTiming
+
+    # Same file, same session: a rerun after a crash reuses its IDs and paths
+    session_id = hashlib.sha1(path.encode("utf-8")).hexdigest()[:32]
+    started = time.strftime("%Y-%m-%d %H:%M:%S")
+
+    # Speaker profiles left by an interrupted attempt would skew this one
+    embedding_file = f"speaker_embeddings/session_{session_id}.pkl"
+    if os.path.exists(embedding_file):
+        os.remove(embedding_file)
+    diarizer = SpeakerDiarizer(session_id)
+    archiver = AudioArchiver(session_id) if RETAIN_AUDIO else None
+
+    chunk_rows = []
+    word_rows = []
+    transcript_lines = []
+    for n, ((audio, start), (segment_texts, words)) in enumerate(zip(chunks, results), 1):
+        text = " ".join(segment_texts)
+        if not text:
+            continue
+
+        chunk_id = f"speaker_{n}"
+        unique_chunk_id = f"{session_id}_{chunk_id}"
+        timestamp = _format_offset(start / float(ASR_SAMPLE_RATE))
+        audio_path = archiver.save(chunk_id, audio, ASR_SAMPLE_RATE) if archiver else None
+        speaker_id = diarizer.identify_speaker(audio, "speaker", ASR_SAMPLE_RATE)
+
+        chunk_rows.append((unique_chunk_id, session_id, timestamp, text, audio_path, "speaker", speaker_id))
+        words = [WordTiming(*word) for word in words]
+        word_rows.extend(
+            (unique_chunk_id, i, w.word.strip(), w.start, w.end, w.probability, char_start, char_end)
+            for i, (w, (char_start, char_end)) in enumerate(zip(words, word_offsets(text, words)))
+        )
+        transcript_lines.append(f"[{timestamp}] {speaker_id or 'Speaker'}: {text}")
+
+    if archiver:
+        archiver.close()
+
+    os.makedirs("transcriptions", exist_ok=True)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    transcript_file = f"transcriptions/{stem}_{session_id[:8]}.txt"
+    with open(transcript_file, "w", encoding="utf-8") as f:
+        f.write(f"Transcription Session: {session_id}\n")
+        f.write(f"Source file: {path}\n")
+        f.write(f"Transcribed: {started}\n")
+        f.write("-" * 50 + "\n\n")
+        f.write("\n".join(transcript_lines))
+        f.write("\n")
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    with conn:
+        # Replace whatever a crashed run may have left behind for this session
+        cursor.execute("DELETE FROM words WHERE chunk_id IN (SELECT chunk_id FROM chunks WHERE session_id = ?)",
+                       (session_id,))
+        cursor.execute("DELETE FROM chunks WHERE session_id = ?", (session_id,))
+        cursor.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, start_time, end_time, active) VALUES (?, ?, ?, ?)",
+            (session_id, started, time.strftime("%Y-%m-%d %H:%M:%S"), 0)
+        )
+        cursor.executemany(
+            "INSERT INTO chunks (chunk_id, session_id, timestamp, text, audio_path, source, speaker_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            chunk_rows
+        )
+        cursor.executemany(
+            "INSERT INTO words (chunk_id, word_index, word, start_time, end_time, probability, char_start, char_end) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            word_rows
+        )
+        cursor.execute(
+            "INSERT OR REPLACE INTO batch_files (path, session_id, finished_at, chunks) VALUES (?, ?, ?, ?)",
+            (path, session_id, time.strftime("%Y-%m-%d %H:%M:%S"), len(chunk_rows))
+        )
+    conn.close()
+
+    log_message(f"Finished {path}: {len(chunk_rows)} chunks -> {transcript_file}", session_id)
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe a directory of audio files offline")
+    parser.add_argument("directory", help="Directory searched (recursively) for audio files")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Transcription processes (default: one per GPU, or one per 4 cores on CPU)")
+    parser.add_argument("--piece-duration", type=float, default=300,
+                        help="Seconds of speech sent to a worker at a time (default: 300)")
+    args = parser.parse_args()
+
+    init_database()
+    done = finished_files()
+    paths = [path for path in find_audio_files(args.directory) if path not in done]
+    log_message(f"{len(paths)} files to transcribe ({len(done)} already done)")
+    if not paths:
+        return
+
+    # Each process loads its own model: on a GPU host that means one copy per GPU
+    from services.transcription import select_device, cuda_device_count
+    gpus = max(1, cuda_device_count()) if select_device() == "cuda" else 0
+    if args.workers is None:
+        args.workers = gpus or max(1, (os.cpu_count() or 1) // 4)
+    cpu_threads = max(1, (os.cpu_count() or 1) // args.workers)
+
+    # Querying the GPUs initialised CUDA here, which forked children can't
+    # reliably use, so the workers are spawned instead
+    mp_context = multiprocessing.get_context("spawn")
+
+    # GPUs are handed out round-robin, one per process
+    device_indices = mp_context.Queue()
+    for i in range(args.workers):
+        device_indices.put(i % gpus if gpus else 0)
+    start_time = time.monotonic()
+    audio_seconds = 0.0
+
+    # Files whose pieces are in the pool, committed strictly in order
+    pending = collections.deque()
+    in_flight = 0
+
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=mp_context, initializer=_init_worker,
+                             initargs=(cpu_threads, device_indices)) as pool:
+        def commit_oldest():
+            nonlocal in_flight
+            path, chunks, futures = pending.popleft()
+            try:
+                results = [result for future in futures for result in future.result()]
+                commit_file(path, chunks, results)
+            except Exception as e:
+                # Not marked as finished, so the next run tries it again
+                log_message(f"Error transcribing {path}: {e}")
+            finally:
+                in_flight -= len(futures)
+
+        for path in paths:
+            try:
+                chunks = split_file(path)
+            except Exception as e:
+                log_message(f"Skipping {path}: {e}")
+                continue
+
+            audio_seconds += sum(len(audio) for audio, _ in chunks) / float(ASR_SAMPLE_RATE)
+            futures = [pool.submit(_transcribe_piece, piece) for piece in group_pieces(chunks, args.piece_duration)]
+            pending.append((path, chunks, futures))
+            in_flight += len(futures)
+
+            # Keep every worker busy without holding the whole directory in memory
+            while pending and (in_flight > 2 * args.workers or all(f.done() for f in pending[0][2])):
+                commit_oldest()
+
+        while pending:
+            commit_oldest()
+
+    total_time = time.monotonic() - start_time
+    log_message(f"Transcribed {len(paths)} files ({audio_seconds:.0f}s of speech) in {total_time:.0f}s")
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,100 @@ import os
 SAMPLE_RATE = 48000  # Hz
 CHUNK_DURATION = 5  # seconds per chunk
 PROCESSING_INTERVAL = 5  # seconds between processing chunks
+BUFFER_DURATION = 30  # seconds of audio held in each source's ring buffer
 
 # Database settings
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transcriptions.db")
 
+# Transcription cache: identical audio decoded with the same settings is only transcribed once
+TRANSCRIPTION_CACHE = True
+TRANSCRIPTION_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transcription_cache.db")
+TRANSCRIPTION_CACHE_MAX_MB = 64  # Least recently used entries are evicted past this size
+
 # Transcription model settings
 MODEL_SIZE = "large-v3"  # Whisper model size
-USE_CUDA = True  # Whether to use GPU acceleration
+USE_CUDA = True  # Whether to use GPU acceleration when one is available
+DEVICE = "auto"  # "auto" (CUDA if available and USE_CUDA, else CPU), "cuda" or "cpu"
+CUDA_COMPUTE_TYPE = "float16"
+CPU_COMPUTE_TYPE = "int8"  # "int8" or "int8_float32" for commodity CPUs
+CPU_THREADS = 0  # intra-op threads per worker for CPU inference (0 = split cores between workers)
+TRANSCRIPTION_WORKERS = 1  # parallel transcription threads sharing the model, shared by all sessions
+DEFAULT_SESSION_WEIGHT = 1.0  # a session's share of the workers relative to other sessions
+SESSION_MAX_CONCURRENCY = TRANSCRIPTION_WORKERS  # batches one session may have decoding at once
+BATCH_SIZE = 4  # max backed-up chunks decoded together in one batched call (1 disables batching)
+ASR_SAMPLE_RATE = 16000  # Whisper expects 16 kHz mono float32 input
+
+# Transcription queue settings
+TRANSCRIPTION_QUEUE_SIZE = 8  # chunks waiting for Whisper before the overflow policy kicks in
+QUEUE_FULL_POLICY = "drop_oldest"  # "drop_oldest", "merge" or "fast_model"
+FAST_MODEL_SIZE = "base"  # model used by the "fast_model" policy while the queue is saturated
+
+# Latency deadlines: seconds after a chunk's last sample by which its text should be shown.
+# The queue serves the most urgent source first; chunks already past their deadline
+# are decoded in a cheaper pass (the cheapest allowed quality ladder level)
+LATENCY_DEADLINES = {"mic": 3.0, "speaker": 3.0}
+DEFAULT_LATENCY_DEADLINE = 3.0  # for other source names
+
+# Write-behind persistence: transcribed chunks are stored by a background writer
+RESULT_FLUSH_INTERVAL = 0.25  # seconds the writer collects results before one DB transaction and file append
+RESULT_FLUSH_MAX = 64  # most chunks written in one flush
+
+# Pipeline latency instrumentation (per-stage timings of every chunk, see /api/metrics)
+PIPELINE_METRICS_WINDOW = 500  # most recent samples kept per stage
+LATENCY_HISTOGRAM_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0]  # seconds
+RTF_HISTOGRAM_BUCKETS = [0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0]  # decode time / audio time
+
+# Adaptive decoding quality ladder, best level first. "main" is MODEL_SIZE and
+# "fast" is FAST_MODEL_SIZE; beam_size 1 is greedy decoding
+QUALITY_LADDER = [
+    {"model": "main", "beam_size": 10},
+    {"model": "main", "beam_size": 5},
+    {"model": "main", "beam_size": 1},
+    {"model": "fast", "beam_size": 1}
+]
+LADDER_MIN_LEVEL = 0  # Best level the transcriber may use
+LADDER_MAX_LEVEL = 3  # Cheapest level it may fall back to
+LADDER_STEP_DOWN_RTF = 0.8  # Step down when decoding takes longer than this fraction of real time
+LADDER_STEP_UP_RTF = 0.4  # Step back up when it is faster than this and the queue is empty
+LADDER_STEP_DOWN_QUEUE = 4  # Queue depth that also triggers a step down
+LADDER_COOLDOWN = 3  # Decodes between level changes
+
+# Non-speech filtering: chunks without speech are counted but never stored
+VAD_FILTER = True  # Let faster-whisper's Silero VAD strip non-speech before decoding
+SEGMENT_NO_SPEECH_PROB = 0.8  # Drop decoded segments Whisper thinks are this likely to be non-speech
+
+# Transcription language
+LANGUAGE = None  # Whisper language code (e.g. "en") to skip detection, or None to detect once per session
+LANGUAGE_CONFIDENCE = 0.8  # Minimum detection probability for a chunk to count towards pinning
+LANGUAGE_DETECTION_CHUNKS = 2  # Consecutive confident chunks that must agree before the language is pinned
+LANGUAGE_REDETECT = True  # Detect again when decoding with the pinned language goes badly
+LANGUAGE_REDETECT_LOGPROB = -1.0  # Average log probability below which a chunk counts as poorly decoded
+LANGUAGE_REDETECT_CHUNKS = 3  # Poorly decoded chunks in a row that trigger re-detection
+
+# Streaming partial transcription for live captions
+PARTIAL_TRANSCRIPTION = True  # Re-decode the chunk still being recorded to show text early
+PARTIAL_INTERVAL = 0.5  # Seconds between partial decodes
+PARTIAL_MIN_DURATION = 0.5  # Don't decode open chunks shorter than this
+PARTIAL_EXPIRY = 30  # Drop partials whose chunk never got committed after this many seconds
+
+# Audio retention settings
+RETAIN_AUDIO = True  # Keep each transcribed chunk's audio in audio_chunks/
+ARCHIVE_FULL_RATE = False  # Retain audio at SAMPLE_RATE instead of ASR_SAMPLE_RATE
+
+# Voice activity detection / chunking settings
+MIN_CHUNK_DURATION = 1.0  # seconds; shorter chunks are not cut at a pause
+MAX_CHUNK_DURATION = 10.0  # seconds; longer chunks are cut at their quietest frame
+VAD_FRAME_DURATION = 0.03  # seconds per VAD decision
+VAD_SPEECH_RATIO = 3.0  # speech must be this many times louder than the noise floor
+VAD_PAUSE_DURATION = 0.5  # seconds of silence that end a chunk
+VAD_PADDING_DURATION = 0.2  # seconds of audio kept around speech
+VAD_MIN_SPEECH_DURATION = 0.25  # seconds of speech needed for a chunk to be emitted
+CHUNK_OVERLAP = 0.0  # seconds shared by chunks cut mid-speech, stitched by word timestamps (0 disables)
+
+# Cross-talk detection: drop mic chunks that only repeat the loopback speaker audio
+CROSSTALK_DETECTION = True
+CROSSTALK_MAX_LAG = 0.25  # seconds of acoustic/device delay searched between the two sources
+CROSSTALK_CORRELATION = 0.5  # normalized cross-correlation above which a mic chunk is an echo
 
 # Noise threshold defaults
 DEFAULT_MIC_THRESHOLD = 0.005
@@ -85,6 +85,34 @@ def init_database():
         )
         ''')
     
+    # Word timings of each chunk: times are seconds into the chunk's audio,
+    # character offsets index the chunk's text
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS words (
+        chunk_id TEXT,
+        word_index INTEGER,
+        word TEXT,
+        start_time REAL,
+        end_time REAL,
+        probability REAL,
+        char_start INTEGER,
+        char_end INTEGER,
+        PRIMARY KEY (chunk_id, word_index),
+        FOREIGN KEY (chunk_id) REFERENCES chunks (chunk_id)
+    ) WITHOUT ROWID
+    ''')
+    
+    # Files finished by the offline batch transcriber, so reruns can skip them
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS batch_files (
+        path TEXT PRIMARY KEY,
+        session_id TEXT,
+        finished_at TEXT,
+        chunks INTEGER,
+        FOREIGN KEY (session_id) REFERENCES sessions (session_id)
+    )
+    ''')
+    
     conn.commit()
     conn.close()
     
@@ -147,6 +175,77 @@ def get_audio_path(chunk_id):
     else:
         return None
 
+def get_chunk_words(chunk_id):
+    """Get the timed words of a chunk, in order"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "SELECT word, start_time, end_time, probability, char_start, char_end FROM words "
+        "WHERE chunk_id = ? ORDER BY word_index",
+        (chunk_id,)
+    )
+    words = [dict(row) for row in cursor.fetchall()]
+    
+    conn.close()
+    return words
+
+def audio_offset_for_position(chunk_id, char_offset):
+    """Map a character offset in a chunk's text to the word spoken there.
+    
+    Returns the word (with its start_time into the chunk audio), or None if the
+    chunk has no timed words. Offsets between words map to the next word.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "SELECT word, start_time, end_time, char_start, char_end FROM words "
+        "WHERE chunk_id = ? AND char_end > ? ORDER BY word_index LIMIT 1",
+        (chunk_id, char_offset)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        # Past the last word: seek to the last word
+        cursor.execute(
+            "SELECT word, start_time, end_time, char_start, char_end FROM words "
+            "WHERE chunk_id = ? AND char_end IS NOT NULL ORDER BY word_index DESC LIMIT 1",
+            (chunk_id,)
+        )
+        row = cursor.fetchone()
+    
+    conn.close()
+    return dict(row) if row else None
+
+def position_for_audio_offset(chunk_id, seconds):
+    """Map a time into a chunk's audio to the word being spoken then.
+    
+    Returns the word (with its char_start/char_end in the chunk text), or None
+    if the chunk has no timed words. Times between words map to the next word.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "SELECT word, start_time, end_time, char_start, char_end FROM words "
+        "WHERE chunk_id = ? AND end_time > ? AND char_start IS NOT NULL ORDER BY word_index LIMIT 1",
+        (chunk_id, seconds)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute(
+            "SELECT word, start_time, end_time, char_start, char_end FROM words "
+            "WHERE chunk_id = ? AND char_start IS NOT NULL ORDER BY word_index DESC LIMIT 1",
+            (chunk_id,)
+        )
+        row = cursor.fetchone()
+    
+    conn.close()
+    return dict(row) if row else None
+
 def get_latest_session_id():
     """Get the most recent session ID from the database"""
     conn = sqlite3.connect(DB_PATH)
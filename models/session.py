@@ -44,4 +44,38 @@ class Chunk:
             "audio_path": self.audio_path,
             "source": self.source,
             "speaker_id": self.speaker_id
-        }
\ No newline at end of file
+        }
+
+class AudioChunk:
+    """
+    Model representing captured audio on its way to transcription
+    """
+    def __init__(self, chunk_id, source, audio, sample_rate, audio_level, capture_time=None,
+                 archive_audio=None, archive_sample_rate=None, stream_offset=0.0,
+                 overlap_before=0.0, overlap_after=0.0, deadline=None):
+        self.chunk_id = chunk_id
+        self.source = source  # "mic" or "speaker"
+        self.audio = audio  # mono float32 samples for transcription
+        self.sample_rate = sample_rate
+        self.audio_level = audio_level
+        self.capture_time = capture_time
+        self.archive_audio = archive_audio  # optional full-rate copy for retention
+        self.archive_sample_rate = archive_sample_rate
+        self.stream_offset = stream_offset  # seconds from start of recording to first sample
+        self.overlap_before = overlap_before  # seconds shared with the previous chunk
+        self.overlap_after = overlap_after  # seconds shared with the next chunk
+        self.deadline = deadline  # wall-clock time by which the text should be on screen
+        self.stale = False  # set when dequeued after its deadline; decoded in the cheap pass
+        self.sequence = None  # position in its source's transcription order, set when dequeued
+        self.timings = {}  # time.monotonic() at each pipeline stage, see services/pipeline_metrics.py
+    
+    @property
+    def duration(self):
+        """Length of the chunk in seconds"""
+        return len(self.audio) / float(self.sample_rate)
+    
+    def archive_data(self):
+        """Audio and sample rate to retain on disk"""
+        if self.archive_audio is not None:
+            return self.archive_audio, self.archive_sample_rate
+        return self.audio, self.sample_rate
\ No newline at end of file
@@ -0,0 +1,136 @@
+import queue
+import threading
+from utils.audio_utils import log_message
+from config import BATCH_SIZE
+
+class ASRScheduler:
+    """
+    One pool of transcription workers shared by every running session.
+
+    Sessions are served by weighted fair queueing (start-time fair queueing
+    over seconds of audio): each session carries a virtual finish time that
+    grows by audio_seconds / weight for every batch it is served, and a free
+    worker always takes the next batch from the backlogged session with the
+    smallest one. A long or busy session therefore gets its weighted share of
+    the workers and no more, and a session that was idle restarts at the
+    current virtual time instead of spending credit it banked while quiet.
+
+    A session never has more than its max_concurrency batches decoding at
+    once.
+    """
+    def __init__(self, num_workers):
+        self.lock = threading.Lock()
+        self.work_available = threading.Condition(self.lock)
+        self.entries = {}
+        self.virtual_time = 0.0
+
+        self.threads = []
+        for i in range(num_workers):
+            thread = threading.Thread(target=self._worker, name=f"transcriber-{i + 1}")
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def register(self, session):
+        """Start serving a session's transcription queue."""
+        with self.lock:
+            self.entries[session.session_id] = {
+                "session": session,
+                "in_flight": 0,
+                "virtual_finish": self.virtual_time,
+                "served_seconds": 0.0,
+                "batches": 0
+            }
+            self.work_available.notify_all()
+        session.transcription_queue.on_put = self.notify
+        log_message(f"Registered with the ASR scheduler (weight {session.weight}, "
+                    f"max concurrency {session.max_concurrency})", session.session_id)
+
+    def unregister(self, session):
+        """Stop serving a session. Its queue should already be drained."""
+        session.transcription_queue.on_put = None
+        with self.lock:
+            self.entries.pop(session.session_id, None)
+
+    def notify(self):
+        """Wake a worker: a session has queued work."""
+        with self.lock:
+            self.work_available.notify()
+
+    def busy(self):
+        """Whether any session has a batch decoding."""
+        with self.lock:
+            return any(entry["in_flight"] for entry in self.entries.values())
+
+    def _next_entry(self):
+        """Backlogged session with the smallest virtual finish time. Called with the lock held."""
+        best = None
+        for entry in self.entries.values():
+            session = entry["session"]
+            if entry["in_flight"] >= session.max_concurrency or session.transcription_queue.empty():
+                continue
+            if best is None or entry["virtual_finish"] < best["virtual_finish"]:
+                best = entry
+        return best
+
+    def _charge(self, entry, audio_seconds, served):
+        """Advance a session's virtual finish time by the audio it is served"""
+        with self.lock:
+            start = max(entry["virtual_finish"], self.virtual_time)
+            entry["virtual_finish"] = start + audio_seconds / entry["session"].weight
+            self.virtual_time = start
+            entry["served_seconds"] += audio_seconds
+            entry["batches"] += 1 if served else 0
+
+    def _worker(self):
+        """Take batches from sessions in fair-share order and transcribe them."""
+        while True:
+            with self.lock:
+                entry = self._next_entry()
+                while entry is None:
+                    self.work_available.wait(timeout=1)
+                    entry = self._next_entry()
+                entry["in_flight"] += 1
+
+            session = entry["session"]
+            try:
+                try:
+                    chunks = session.transcription_queue.get_batch(BATCH_SIZE, block=False)
+                except queue.Empty:
+                    chunks = []
+
+                # Charge the session for the audio it is about to be served. A failure
+                # here must not strand the chunks: only process_batch delivers them
+                # and marks them done
+                try:
+                    self._charge(entry, sum(chunk.duration for chunk in chunks), bool(chunks))
+                except Exception as e:
+                    log_message(f"Error charging session in ASR scheduler: {str(e)}", session.session_id)
+
+                if chunks:
+                    session.process_batch(chunks)
+            except Exception as e:
+                log_message(f"Error in ASR scheduler: {str(e)}", session.session_id)
+            finally:
+                with self.lock:
+                    entry["in_flight"] -= 1
+                    self.work_available.notify()
+
+    def get_state(self):
+        """Per-session share of the workers."""
+        with self.lock:
+            total = sum(entry["served_seconds"] for entry in self.entries.values())
+            return {
+                "workers": len(self.threads),
+                "sessions": {
+                    session_id: {
+                        "weight": entry["session"].weight,
+                        "max_concurrency": entry["session"].max_concurrency,
+                        "in_flight": entry["in_flight"],
+                        "batches": entry["batches"],
+                        "served_seconds": round(entry["served_seconds"], 1),
+                        "share": round(entry["served_seconds"] / total, 3) if total else None
+                    }
+                    for session_id, entry in self.entries.items()
+                }
+            }
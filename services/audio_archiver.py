@@ -0,0 +1,57 @@
+import os
+import queue
+import threading
+import time
+import soundfile as sf
+from utils.audio_utils import log_message
+
+class AudioArchiver:
+    """Writes retained chunk audio to disk on a background thread.
+
+    Write durations are reported to `metrics` (a PipelineMetrics) as the
+    "archive" stage, if given.
+    """
+    def __init__(self, session_id, directory="audio_chunks", metrics=None):
+        self.session_id = session_id
+        self.directory = directory
+        self.metrics = metrics
+        self.write_queue = queue.Queue()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.writer_thread = threading.Thread(target=self._write_chunks)
+        self.writer_thread.daemon = True
+        self.writer_thread.start()
+
+    def archive_path(self, chunk_id):
+        """Get the permanent path for a chunk's audio."""
+        return f"{self.directory}/{self.session_id}_{chunk_id}.wav"
+
+    def save(self, chunk_id, audio, sample_rate):
+        """Queue audio for writing and return the path it will be written to."""
+        path = self.archive_path(chunk_id)
+        self.write_queue.put((path, audio, sample_rate))
+        return path
+
+    def _write_chunks(self):
+        """Write queued audio to disk until closed."""
+        while True:
+            item = self.write_queue.get()
+            try:
+                if item is None:
+                    break
+
+                path, audio, sample_rate = item
+                start = time.monotonic()
+                sf.write(file=path, data=audio, samplerate=sample_rate)
+                if self.metrics:
+                    self.metrics.record("archive", time.monotonic() - start)
+            except Exception as e:
+                log_message(f"Error archiving audio: {str(e)}", self.session_id)
+            finally:
+                self.write_queue.task_done()
+
+    def close(self):
+        """Flush pending writes and stop the writer thread."""
+        self.write_queue.put(None)
+        self.writer_thread.join()
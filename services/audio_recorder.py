@@ -1,318 +1,338 @@
 import threading
 import numpy as np
 import time
-import os
-import soundfile as sf
-import soundcard as sc
-from utils.audio_utils import log_message
-from config import SAMPLE_RATE, CHUNK_DURATION
+from utils.audio_utils import log_message, StreamingResampler, max_normalized_correlation
+from utils.ring_buffer import AudioRingBuffer
+from models.session import AudioChunk
+from services.vad import SpeechSegmenter
+from services.audio_sources import default_sources
+from config import (ASR_SAMPLE_RATE, BUFFER_DURATION,
+                    DEFAULT_MIC_THRESHOLD, DEFAULT_SPEAKER_THRESHOLD,
+                    RETAIN_AUDIO, ARCHIVE_FULL_RATE, CHUNK_OVERLAP,
+                    CROSSTALK_DETECTION, CROSSTALK_MAX_LAG, CROSSTALK_CORRELATION,
+                    LATENCY_DEADLINES, DEFAULT_LATENCY_DEADLINE)
 
 class ContinuousRecorder:
-    def __init__(self, session):
+    def __init__(self, session, sources=None):
+        """
+        Capture and chunk audio for a session.
+        
+        sources maps a source name ("mic", "speaker") to an AudioSource;
+        by default the soundcard microphone and loopback speaker are used.
+        """
         self.session = session
         self.is_recording = True
+        self.threads = []
+
+        # Initialize audio sources
+        if sources is None:
+            try:
+                sources = default_sources()
+            except Exception as e:
+                log_message(f"Error initializing audio devices: {e}", self.session.session_id)
+                sources = {}
+        self.sources = sources
+        names = list(self.sources)
+        for name, audio_source in self.sources.items():
+            log_message(f"Using {name}: {audio_source.name} ({audio_source.sample_rate} Hz)", self.session.session_id)
+
+        # Separate fixed-size ring buffers for mic and speaker. Each one has a
+        # single writer (its capture thread) and a single reader (its chunk
+        # processor), so no lock is shared between the two sources.
+        # Audio is resampled to ASR_SAMPLE_RATE as it is captured, so buffers
+        # and chunks only ever hold what Whisper needs.
+        buffer_frames = int(BUFFER_DURATION * ASR_SAMPLE_RATE)
+        self.buffers = {source: AudioRingBuffer(buffer_frames) for source in names}
+        self.resamplers = {
+            source: StreamingResampler(self.sources[source].sample_rate, ASR_SAMPLE_RATE)
+            for source in names
+        }
         
-        # Separate buffers for mic and speaker
-        self.mic_buffer = np.array([])
-        self.speaker_buffer = np.array([])
-        self.buffer_lock = threading.Lock()
-        
-        # Separate positions for processing
-        self.last_mic_pos = 0
-        self.last_speaker_pos = 0
-        
+        # Optional full-rate copy of each source, kept only for retained audio
+        self.archive_buffers = {}
+        if RETAIN_AUDIO and ARCHIVE_FULL_RATE:
+            self.archive_buffers = {
+                source: AudioRingBuffer(int(BUFFER_DURATION * self.sources[source].sample_rate))
+                for source in names
+            }
+
         # Separate chunk counters
-        self.mic_chunk_counter = 0
-        self.speaker_chunk_counter = 0
-        
+        self.chunk_counters = {source: 0 for source in names}
+
         # Noise thresholds - can be adjusted independently
-        self.mic_noise_threshold = 0.005
-        self.speaker_noise_threshold = 0.01
+        self.noise_thresholds = {
+            source: DEFAULT_MIC_THRESHOLD if source == "mic" else DEFAULT_SPEAKER_THRESHOLD
+            for source in names
+        }
         
-        # Initialize audio devices
-        try:
-            self.default_mic = sc.default_microphone()
-            self.loopback_speaker = sc.get_microphone(id=str(sc.default_speaker().name), include_loopback=True)
-            log_message(f"Using mic: {self.default_mic.name} and speaker: {self.loopback_speaker.name}", self.session.session_id)
-        except Exception as e:
-            log_message(f"Error initializing audio devices: {e}", self.session.session_id)
-            return
-        
-        # Start recording threads
-        self.mic_thread = threading.Thread(target=self._record_microphone)
-        self.mic_thread.daemon = True
-        self.mic_thread.start()
-        
-        self.speaker_thread = threading.Thread(target=self._record_speaker)
-        self.speaker_thread.daemon = True
-        self.speaker_thread.start()
+        # Voice activity detection decides where each source's chunks start and end
+        self.segmenters = {
+            source: SpeechSegmenter(ASR_SAMPLE_RATE, self.noise_thresholds[source])
+            for source in names
+        }
+        # Guards each segmenter so partial transcription can look at the open chunk
+        self.segment_locks = {source: threading.Lock() for source in names}
         
-        # Start processing threads
-        self.mic_processing_thread = threading.Thread(target=self._process_mic_chunks)
-        self.mic_processing_thread.daemon = True
-        self.mic_processing_thread.start()
+        # Overlap mode: a chunk cut mid-speech shares its tail with the next chunk
+        self.overlap_frames = int(CHUNK_OVERLAP * ASR_SAMPLE_RATE)
+        self.overlap_tails = {source: None for source in names}
+        self.archive_tails = {source: None for source in names}
+        self.last_chunk_end = {source: None for source in names}
         
-        self.speaker_processing_thread = threading.Thread(target=self._process_speaker_chunks)
-        self.speaker_processing_thread.daemon = True
-        self.speaker_processing_thread.start()
-    
-    def _record_microphone(self):
-        """Record from microphone to separate buffer."""
-        log_message("Microphone recording started", self.session.session_id)
-        
-        # Small frames for low latency
-        frames_per_step = int(SAMPLE_RATE * 0.1)
-        
-        try:
-            with self.default_mic.recorder(samplerate=SAMPLE_RATE) as mic_recorder:
-                while self.is_recording:
-                    # Record microphone
-                    mic_data = mic_recorder.record(numframes=frames_per_step)
-                    
-                    # Convert to mono
-                    if mic_data.shape[1] > 0:
-                        new_data = mic_data[:, 0].copy()
-                    else:
-                        new_data = np.zeros(frames_per_step)
-                    
-                    # Add to mic buffer
-                    with self.buffer_lock:
-                        if len(self.mic_buffer) == 0:
-                            self.mic_buffer = new_data
-                        else:
-                            self.mic_buffer = np.concatenate((self.mic_buffer, new_data))
-                    
-                    # Short sleep to prevent CPU overuse
-                    time.sleep(0.01)
-        except Exception as e:
-            log_message(f"Error in microphone recording: {e}", self.session.session_id)
-    
-    def _record_speaker(self):
-        """Record from speaker to separate buffer."""
-        log_message("Speaker recording started", self.session.session_id)
+        # How far each source's discarded speech spans have been reported
+        self.discards_reported = {source: 0 for source in names}
         
+        # Mic chunks that only repeat what the loopback speaker played
+        self.crosstalk_check = CROSSTALK_DETECTION and "mic" in names and "speaker" in names
+        self.crosstalk_suppressed = 0
+
+        # Start one recording thread and one processing thread per source
+        for source in names:
+            for target in (self._record_source, self._process_chunks):
+                thread = threading.Thread(target=target, args=(source,))
+                thread.daemon = True
+                thread.start()
+                self.threads.append(thread)
+
+    def _record_source(self, source):
+        """Record from one audio source into its own ring buffer."""
+        log_message(f"{source.capitalize()} recording started", self.session.session_id)
+
         # Small frames for low latency
-        frames_per_step = int(SAMPLE_RATE * 0.1)
-        
+        audio_source = self.sources[source]
+        frames_per_step = int(audio_source.sample_rate * 0.1)
+        buffer = self.buffers[source]
+        resampler = self.resamplers[source]
+        archive_buffer = self.archive_buffers.get(source)
+
         try:
-            with self.loopback_speaker.recorder(samplerate=SAMPLE_RATE) as speaker_recorder:
+            with audio_source:
                 while self.is_recording:
-                    # Record speaker output
-                    speaker_data = speaker_recorder.record(numframes=frames_per_step)
-                    
-                    # Convert to mono
-                    if speaker_data.shape[1] > 0:
-                        new_data = speaker_data[:, 0].copy()
-                    else:
-                        new_data = np.zeros(frames_per_step)
+                    # Blocks until the source has delivered the requested frames
+                    new_data = audio_source.read(frames_per_step)
+                    if new_data is None:
+                        log_message(f"{source.capitalize()} source reached end of stream", self.session.session_id)
+                        break
+
+                    resampled = resampler.process(new_data)
                     
-                    # Add to speaker buffer
-                    with self.buffer_lock:
-                        if len(self.speaker_buffer) == 0:
-                            self.speaker_buffer = new_data
-                        else:
-                            self.speaker_buffer = np.concatenate((self.speaker_buffer, new_data))
+                    # A source that is not live waits for the chunk processor instead of
+                    # overwriting audio it has not read yet
+                    if not audio_source.live:
+                        buffer.wait_for_space(len(resampled))
+
+                    # Full-rate copy goes in first so it is never behind the ASR stream
+                    if archive_buffer is not None:
+                        archive_buffer.write(new_data)
                     
-                    # Short sleep to prevent CPU overuse
-                    time.sleep(0.01)
+                    # Add 16 kHz audio to buffer; wakes the chunk processor if it is waiting
+                    buffer.write(resampled)
         except Exception as e:
-            log_message(f"Error in speaker recording: {e}", self.session.session_id)
+            log_message(f"Error in {source} recording: {e}", self.session.session_id)
+        finally:
+            buffer.close()
     
-    def _process_mic_chunks(self):
-        """Process microphone chunks separately."""
-        log_message("Microphone chunk processing started", self.session.session_id)
-        log_message(f"Using mic noise threshold: {self.mic_noise_threshold}", self.session.session_id)
-        
-        # Wait to gather initial audio
-        time.sleep(2)
+    def _read_archive(self, source, start, end):
+        """Read the full-rate audio covering ASR frames [start, end)."""
+        archive_buffer = self.archive_buffers[source]
+        ratio = self.sources[source].sample_rate / float(ASR_SAMPLE_RATE)
+        archive_start = int(round(start * ratio))
+        archive_end = int(round(end * ratio))
         
-        # Create temp directory if needed
-        os.makedirs(self.session.temp_dir, exist_ok=True)
-        
-        chunk_size = int(CHUNK_DURATION * SAMPLE_RATE)
+        # Drop audio the ASR stream skipped (e.g. chunks under the noise threshold)
+        if archive_buffer.read_pos < archive_start:
+            archive_buffer.skip(archive_start - archive_buffer.read_pos)
         
+        return archive_buffer.read(archive_end - archive_buffer.read_pos)
+
+    def _process_chunks(self, source):
+        """Cut a source's audio into speech chunks at pauses as soon as it arrives."""
+        log_message(f"{source.capitalize()} chunk processing started", self.session.session_id)
+        log_message(f"Using {source} noise threshold: {self.noise_thresholds[source]}", self.session.session_id)
+
+        buffer = self.buffers[source]
+        segmenter = self.segmenters[source]
+        segment_lock = self.segment_locks[source]
+        dropped_frames = buffer.dropped_frames
+
         while self.is_recording:
             try:
-                current_time = time.time()
-                
-                with self.buffer_lock:
-                    # Calculate positions
-                    buffer_length = len(self.mic_buffer)
-                    unprocessed_length = buffer_length - self.last_mic_pos
-                    
-                    # Process if we have a full chunk
-                    if unprocessed_length >= chunk_size:
-                        # Get chunk boundaries
-                        start_pos = self.last_mic_pos
-                        chunk_end_pos = start_pos + chunk_size
-                        
-                        # Ensure we're within buffer
-                        if chunk_end_pos > buffer_length:
-                            chunk_end_pos = buffer_length
-                        
-                        # Safety check
-                        if start_pos >= buffer_length or start_pos < 0 or chunk_end_pos <= start_pos:
-                            log_message("Invalid mic buffer positions - resetting", self.session.session_id)
-                            self.last_mic_pos = max(0, buffer_length - chunk_size)
-                            time.sleep(0.5)
-                            continue
-                        
-                        # Extract chunk
-                        chunk_data = self.mic_buffer[start_pos:chunk_end_pos].copy()
-                        
-                        # Verify chunk size
-                        if len(chunk_data) != chunk_size:
-                            log_message(f"Mic chunk size mismatch. Expected {chunk_size}, got {len(chunk_data)}. Skipping.", 
-                                     self.session.session_id)
-                            self.last_mic_pos += len(chunk_data)
-                            continue
-                        
-                        # Update position
-                        self.last_mic_pos = chunk_end_pos
-                        
-                        # Calculate audio level
-                        audio_level = np.abs(chunk_data).mean()
-                        
-                        # Apply noise threshold
-                        if audio_level < self.mic_noise_threshold:
-                            # Skip this chunk - likely just background noise
-                            continue
-                        
-                        # Increment chunk counter
-                        self.mic_chunk_counter += 1
-                        chunk_id = f"mic_{self.mic_chunk_counter}"
-                        
-                        # Save file
-                        temp_file = f"{self.session.temp_dir}/{chunk_id}_{int(current_time)}.wav"
-                        
-                        # Check audio data validity
-                        if np.isnan(chunk_data).any() or np.isinf(chunk_data).any():
-                            chunk_data = np.nan_to_num(chunk_data)
-                        
-                        # Save with error handling
-                        try:
-                            sf.write(file=temp_file, data=chunk_data, samplerate=SAMPLE_RATE)
-                            
-                            # Verify file was created
-                            if os.path.exists(temp_file) and os.path.getsize(temp_file) > 100:
-                                # Add to queue with source=mic flag
-                                self.session.transcription_queue.put((temp_file, chunk_id, audio_level, "mic"))
-                                log_message(f"Processed mic chunk {chunk_id} (level: {audio_level:.6f})", self.session.session_id)
-                            else:
-                                log_message(f"Failed to save valid mic audio file", self.session.session_id)
-                        except Exception as e:
-                            log_message(f"Error saving mic audio: {str(e)}", self.session.session_id)
-                
-                # Sleep before checking again
-                time.sleep(0.05)
-                
+                # Sleep until the capture thread has written at least one VAD frame
+                if not buffer.wait_for_frames(segmenter.frame_size):
+                    if buffer.closed:
+                        # End of stream: whatever speech is still open becomes a chunk
+                        with segment_lock:
+                            completed = segmenter.flush()
+                        self._report_discards(source)
+                        for chunk_data, start_pos, continued in completed:
+                            self._emit_chunk(source, chunk_data, start_pos, continued)
+                        break
+                    continue
+
+                # Run everything buffered through the VAD (advances the read cursor)
+                samples = buffer.read(buffer.available())
+
+                # Audio was overwritten before we read it: restart the segmenter
+                # where these samples really start, so chunk positions stay true
+                lost = buffer.dropped_frames - dropped_frames
+                dropped_frames = buffer.dropped_frames
+                if lost:
+                    log_message(f"{source.capitalize()} lost {lost} frames to a buffer overrun", self.session.session_id)
+
+                with segment_lock:
+                    completed = segmenter.resync(buffer.read_pos - len(samples)) if lost else []
+                    completed = completed + segmenter.feed(samples)
+                self._report_discards(source)
+                for chunk_data, start_pos, continued in completed:
+                    self._emit_chunk(source, chunk_data, start_pos, continued)
+
             except Exception as e:
-                log_message(f"Error processing mic chunk: {str(e)}", self.session.session_id)
-                time.sleep(0.5)
-    
-    def _process_speaker_chunks(self):
-        """Process speaker chunks separately."""
-        log_message("Speaker chunk processing started", self.session.session_id)
-        log_message(f"Using speaker noise threshold: {self.speaker_noise_threshold}", self.session.session_id)
-        
-        # Wait to gather initial audio
-        time.sleep(2)
+                log_message(f"Error processing {source} chunk: {str(e)}", self.session.session_id)
+
+    def _report_discards(self, source):
+        """Tell the session about speech spans the segmenter dropped, so their live captions go."""
+        discarded_until = self.segmenters[source].discarded_until
+        if discarded_until > self.discards_reported[source]:
+            self.discards_reported[source] = discarded_until
+            self.session.discard_partial(source, discarded_until / float(ASR_SAMPLE_RATE))
+
+    def _emit_chunk(self, source, chunk_data, start_pos, continued=False):
+        """Queue one speech chunk for transcription."""
+        buffer = self.buffers[source]
+        end_pos = start_pos + len(chunk_data)
+
+        archive_audio = None
+        if source in self.archive_buffers:
+            archive_audio = self._read_archive(source, start_pos, end_pos)
+
+        # Lead in with the tail of the previous chunk when this one picks up mid-speech
+        overlap_before = 0.0
+        tail = self.overlap_tails[source]
+        if tail is not None and self.last_chunk_end[source] == start_pos:
+            chunk_data = np.concatenate((tail, chunk_data))
+            start_pos -= len(tail)
+            overlap_before = len(tail) / float(ASR_SAMPLE_RATE)
+            if archive_audio is not None and self.archive_tails[source] is not None:
+                archive_audio = np.concatenate((self.archive_tails[source], archive_audio))
+
+        # Remember this chunk's tail if the next chunk will continue from it
+        overlap_after = 0.0
+        self.last_chunk_end[source] = end_pos
+        self.overlap_tails[source] = None
+        self.archive_tails[source] = None
+        if continued and self.overlap_frames:
+            self.overlap_tails[source] = chunk_data[-self.overlap_frames:]
+            overlap_after = len(self.overlap_tails[source]) / float(ASR_SAMPLE_RATE)
+            if archive_audio is not None:
+                archive_overlap = int(round(overlap_after * self.sources[source].sample_rate))
+                self.archive_tails[source] = archive_audio[-archive_overlap:]
+
+        # Skip mic chunks that are just the speaker output picked up by the mic
+        if source == "mic" and self.crosstalk_check and self._is_crosstalk(chunk_data, start_pos):
+            self.session.discard_partial(source, end_pos / float(ASR_SAMPLE_RATE))
+            return
+
+        # Wall-clock time of the chunk's first sample, and monotonic time of its last.
+        # A source that is not live runs ahead of the processor on its own schedule,
+        # so its buffer position says nothing about when the audio was heard.
+        live = self.sources[source].live
+        if live:
+            capture_time = time.time() - (buffer.write_pos - start_pos) / float(ASR_SAMPLE_RATE)
+            captured = time.monotonic() - (buffer.write_pos - end_pos) / float(ASR_SAMPLE_RATE)
+        else:
+            capture_time = None
+            captured = time.monotonic()
+
+        # Calculate audio level
+        audio_level = np.abs(chunk_data).mean()
+
+        # Increment chunk counter
+        self.chunk_counters[source] += 1
+        chunk_id = f"{source}_{self.chunk_counters[source]}"
+
+        # Check audio data validity
+        if np.isnan(chunk_data).any() or np.isinf(chunk_data).any():
+            chunk_data = np.nan_to_num(chunk_data)
+
+        # Hand the samples straight to the transcriber - nothing touches disk here
+        # The text is due a fixed time after the chunk's last sample; replays have no deadline
+        deadline = None
+        if live:
+            deadline = capture_time + len(chunk_data) / float(ASR_SAMPLE_RATE) + \
+                LATENCY_DEADLINES.get(source, DEFAULT_LATENCY_DEADLINE)
+
+        chunk = AudioChunk(chunk_id, source, chunk_data, ASR_SAMPLE_RATE, audio_level, capture_time,
+                           stream_offset=start_pos / float(ASR_SAMPLE_RATE),
+                           overlap_before=overlap_before, overlap_after=overlap_after, deadline=deadline)
+        if archive_audio is not None:
+            chunk.archive_audio = archive_audio
+            chunk.archive_sample_rate = self.sources[source].sample_rate
+
+        chunk.timings["captured"] = captured
+        chunk.timings["queued"] = time.monotonic()
+        # Only live sources can lose chunks to the queue's overflow policy
+        self.session.transcription_queue.put(chunk, block=not live)
+        log_message(f"Processed {source} chunk {chunk_id} ({chunk.duration:.1f}s, level: {audio_level:.6f})", self.session.session_id)
+
+    def open_segment(self, source):
+        """Audio of the speech chunk a source is still collecting, as (audio, start_pos, capture_time).
+
+        Returns None between chunks.
+        """
+        with self.segment_locks[source]:
+            segment = self.segmenters[source].open_segment()
+        if segment is None:
+            return None
+
+        audio, start_pos = segment
+        capture_time = time.time() - (self.buffers[source].write_pos - start_pos) / float(ASR_SAMPLE_RATE)
+        return audio, start_pos, capture_time
+
+    def _is_crosstalk(self, chunk_data, start_pos):
+        """Check whether a mic chunk duplicates the speaker audio at the same time."""
+        max_lag = int(CROSSTALK_MAX_LAG * ASR_SAMPLE_RATE)
         
-        # Create temp directory if needed
-        os.makedirs(self.session.temp_dir, exist_ok=True)
+        # Speaker audio for the same stream span, widened by the lag search window.
+        # Read without consuming it - the speaker processor still owns its cursor.
+        reference = self.buffers["speaker"].peek(start_pos - max_lag, start_pos + len(chunk_data) + max_lag)
+        if not reference.any():
+            return False
         
-        chunk_size = int(CHUNK_DURATION * SAMPLE_RATE)
+        correlation, lag = max_normalized_correlation(chunk_data, reference, max_lag)
+        if correlation < CROSSTALK_CORRELATION:
+            return False
         
-        while self.is_recording:
-            try:
-                current_time = time.time()
-                
-                with self.buffer_lock:
-                    # Calculate positions
-                    buffer_length = len(self.speaker_buffer)
-                    unprocessed_length = buffer_length - self.last_speaker_pos
-                    
-                    # Process if we have a full chunk
-                    if unprocessed_length >= chunk_size:
-                        # Get chunk boundaries
-                        start_pos = self.last_speaker_pos
-                        chunk_end_pos = start_pos + chunk_size
-                        
-                        # Ensure we're within buffer
-                        if chunk_end_pos > buffer_length:
-                            chunk_end_pos = buffer_length
-                        
-                        # Safety check
-                        if start_pos >= buffer_length or start_pos < 0 or chunk_end_pos <= start_pos:
-                            log_message("Invalid speaker buffer positions - resetting", self.session.session_id)
-                            self.last_speaker_pos = max(0, buffer_length - chunk_size)
-                            time.sleep(0.5)
-                            continue
-                        
-                        # Extract chunk
-                        chunk_data = self.speaker_buffer[start_pos:chunk_end_pos].copy()
-                        
-                        # Verify chunk size
-                        if len(chunk_data) != chunk_size:
-                            log_message(f"Speaker chunk size mismatch. Expected {chunk_size}, got {len(chunk_data)}. Skipping.", 
-                                     self.session.session_id)
-                            self.last_speaker_pos += len(chunk_data)
-                            continue
-                        
-                        # Update position
-                        self.last_speaker_pos = chunk_end_pos
-                        
-                        # Calculate audio level
-                        audio_level = np.abs(chunk_data).mean()
-                        
-                        # Apply noise threshold
-                        if audio_level < self.speaker_noise_threshold:
-                            # Skip this chunk - likely just background noise
-                            continue
-                        
-                        # Increment chunk counter
-                        self.speaker_chunk_counter += 1
-                        chunk_id = f"speaker_{self.speaker_chunk_counter}"
-                        
-                        # Save file
-                        temp_file = f"{self.session.temp_dir}/{chunk_id}_{int(current_time)}.wav"
-                        
-                        # Check audio data validity
-                        if np.isnan(chunk_data).any() or np.isinf(chunk_data).any():
-                            chunk_data = np.nan_to_num(chunk_data)
-                        
-                        # Save with error handling
-                        try:
-                            sf.write(file=temp_file, data=chunk_data, samplerate=SAMPLE_RATE)
-                            
-                            # Verify file was created
-                            if os.path.exists(temp_file) and os.path.getsize(temp_file) > 100:
-                                # Add to queue with source=speaker flag
-                                self.session.transcription_queue.put((temp_file, chunk_id, audio_level, "speaker"))
-                                log_message(f"Processed speaker chunk {chunk_id} (level: {audio_level:.6f})", self.session.session_id)
-                            else:
-                                log_message(f"Failed to save valid speaker audio file", self.session.session_id)
-                        except Exception as e:
-                            log_message(f"Error saving speaker audio: {str(e)}", self.session.session_id)
-                
-                # Sleep before checking again
-                time.sleep(0.05)
-                
-            except Exception as e:
-                log_message(f"Error processing speaker chunk: {str(e)}", self.session.session_id)
-                time.sleep(0.5)
-    
+        self.crosstalk_suppressed += 1
+        log_message(f"Skipped mic chunk echoing speaker output (correlation {correlation:.2f}, "
+                    f"mic delay {-lag / float(ASR_SAMPLE_RATE) * 1000:.0f} ms, {self.crosstalk_suppressed} skipped so far)",
+                    self.session.session_id)
+        return True
+
+    def join(self, timeout=None):
+        """Wait for every source to end and its last chunk to be queued."""
+        for thread in self.threads:
+            thread.join(timeout)
+
     def set_mic_threshold(self, value):
         """Update microphone noise threshold."""
-        self.mic_noise_threshold = float(value)
-        log_message(f"Mic noise threshold updated to: {self.mic_noise_threshold}", self.session.session_id)
-    
+        self.noise_thresholds["mic"] = float(value)
+        if "mic" in self.segmenters:
+            self.segmenters["mic"].vad.threshold = self.noise_thresholds["mic"]
+        log_message(f"Mic noise threshold updated to: {self.noise_thresholds['mic']}", self.session.session_id)
+
     def set_speaker_threshold(self, value):
         """Update speaker noise threshold."""
-        self.speaker_noise_threshold = float(value)
-        log_message(f"Speaker noise threshold updated to: {self.speaker_noise_threshold}", self.session.session_id)
-    
+        self.noise_thresholds["speaker"] = float(value)
+        if "speaker" in self.segmenters:
+            self.segmenters["speaker"].vad.threshold = self.noise_thresholds["speaker"]
+        log_message(f"Speaker noise threshold updated to: {self.noise_thresholds['speaker']}", self.session.session_id)
+
     def stop(self):
         """Stop all recording."""
         self.is_recording = False
-        log_message("Stopping all recording", self.session.session_id)
\ No newline at end of file
+
+        # Wake processors blocked waiting for audio
+        for buffer in self.buffers.values():
+            buffer.close()
+
+        log_message("Stopping all recording", self.session.session_id)
@@ -0,0 +1,121 @@
+import time
+import numpy as np
+import soundfile as sf
+from config import SAMPLE_RATE
+
+class AudioSource:
+    """
+    Something the ContinuousRecorder can capture from.
+
+    Subclasses return blocks of mono float32 audio at `sample_rate` from
+    read(), blocking until the block is available, and return None once the
+    stream has ended.
+
+    A live source delivers audio at its own pace whether or not the pipeline
+    keeps up; one that is not live is only read as fast as the chunks it
+    produces can be transcribed.
+    """
+    live = True
+
+    def __init__(self, name, sample_rate):
+        self.name = name
+        self.sample_rate = sample_rate
+
+    def open(self):
+        """Start delivering audio."""
+        pass
+
+    def read(self, num_frames):
+        """Return the next num_frames frames, or None at end of stream."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release the underlying device or file."""
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class SoundcardSource(AudioSource):
+    """Live capture from a soundcard microphone or loopback device."""
+    def __init__(self, device, sample_rate=SAMPLE_RATE):
+        super().__init__(device.name, sample_rate)
+        self.device = device
+        self._recorder = None
+
+    def open(self):
+        self._recorder = self.device.recorder(samplerate=self.sample_rate)
+        self._recorder.__enter__()
+
+    def read(self, num_frames):
+        # Blocks until the device has delivered the requested frames
+        data = self._recorder.record(numframes=num_frames)
+
+        # Convert to mono
+        if data.shape[1] > 0:
+            return data[:, 0].astype(np.float32)
+        return np.zeros(num_frames, dtype=np.float32)
+
+    def close(self):
+        if self._recorder is not None:
+            self._recorder.__exit__(None, None, None)
+            self._recorder = None
+
+class FileSource(AudioSource):
+    """
+    Replays a WAV/FLAC (any libsndfile format) file as if it were live.
+
+    With realtime=True blocks are released at the file's own pace; with
+    realtime=False the file is delivered as fast as the pipeline reads it,
+    which is what benchmarks want. Such a replay is not live: it waits for
+    the transcriber instead of losing chunks to the queue's overflow policy.
+    """
+    def __init__(self, path, realtime=True):
+        info = sf.info(path)
+        super().__init__(path, info.samplerate)
+        self.path = path
+        self.realtime = realtime
+        self.live = realtime
+        self._file = None
+        self._frames_read = 0
+        self._start_time = None
+
+    def open(self):
+        self._file = sf.SoundFile(self.path)
+        self._frames_read = 0
+        self._start_time = time.monotonic()
+
+    def read(self, num_frames):
+        data = self._file.read(num_frames, dtype="float32", always_2d=True)
+        if len(data) == 0:
+            return None
+
+        self._frames_read += len(data)
+
+        # Hold the block back until a live device would have delivered it
+        if self.realtime:
+            due = self._start_time + self._frames_read / float(self.sample_rate)
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        # Downmix to mono
+        return data.mean(axis=1).astype(np.float32)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def default_sources():
+    """Default microphone and loopback speaker from soundcard, keyed by source name."""
+    # Imported here so headless hosts can use file sources without an audio stack
+    import soundcard as sc
+
+    mic = sc.default_microphone()
+    speaker = sc.get_microphone(id=str(sc.default_speaker().name), include_loopback=True)
+    return {"mic": SoundcardSource(mic), "speaker": SoundcardSource(speaker)}
@@ -0,0 +1,271 @@
+import collections
+import queue
+import threading
+import time
+import numpy as np
+from models.session import AudioChunk
+from utils.audio_utils import log_message
+
+# What to do when a chunk arrives and the queue is already full
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_MERGE = "merge"
+POLICY_FAST_MODEL = "fast_model"
+
+# Whisper decodes 30 s windows; merged chunks never grow past one
+MAX_MERGED_DURATION = 30.0
+
+class ChunkQueue:
+    """
+    Bounded, deadline-ordered queue of AudioChunks between the recorder and
+    the transcriber.
+
+    Each source keeps its own FIFO (capture order), and get_batch() serves
+    the source whose oldest chunk has the earliest deadline, so a backlog on
+    one source no longer holds back fresh chunks from the other. Chunks
+    whose deadline has already passed are stale: they wait while fresh
+    chunks can still make their deadlines, then go out together (when
+    nothing fresh is queued, or a full batch of them has built up) flagged
+    so the transcriber decodes them in a cheaper pass.
+
+    put() never blocks the capture side of a live source. When the queue is
+    full, the configured policy decides what gives:
+
+    - drop_oldest: discard the oldest queued chunk (across sources)
+    - merge: join the two oldest queued chunks from the same source, so
+      Whisper sees fewer, longer calls (falls back to dropping)
+    - fast_model: keep everything up to the limit and flag the queue as
+      degraded so the transcriber switches to the faster model until the
+      backlog halves (drops only past twice the limit)
+
+    Sources that are not live (e.g. a file replayed as fast as possible) put
+    with block=True instead and wait for room, so nothing is dropped.
+
+    Every decision is counted in `metrics`. Mirrors the queue.Queue methods
+    the session uses (get/task_done/join/empty/qsize).
+    """
+    def __init__(self, maxsize, policy=POLICY_DROP_OLDEST, session_id=None):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.session_id = session_id
+        self.chunks = {}  # source -> deque of chunks in capture order
+        self.depth = 0
+        self.degraded = False
+        self.unfinished_tasks = 0
+        self.next_sequence = collections.defaultdict(int)  # per source
+
+        # Called after every put, e.g. to wake the scheduler serving this queue
+        self.on_put = None
+        # Called with each chunk the overflow policy drops
+        self.on_drop = None
+
+        self.mutex = threading.Lock()
+        self.not_empty = threading.Condition(self.mutex)
+        self.not_full = threading.Condition(self.mutex)
+        self.all_tasks_done = threading.Condition(self.mutex)
+
+        self.metrics = {
+            "enqueued": 0,
+            "dropped": 0,
+            "merged": 0,
+            "degraded_periods": 0,
+            "fast_model_chunks": 0,
+            "stale_chunks": 0,
+            "max_depth": 0
+        }
+
+    def put(self, chunk, block=False):
+        """Add a chunk, applying the overflow policy if the queue is full.
+
+        With block=True, wait until the queue has room instead.
+        """
+        with self.mutex:
+            if block:
+                self.not_full.wait_for(lambda: self.depth < self.maxsize)
+            self.chunks.setdefault(chunk.source, collections.deque()).append(chunk)
+            self.depth += 1
+            self.unfinished_tasks += 1
+            self.metrics["enqueued"] += 1
+
+            if self.depth > self.maxsize:
+                self._handle_overflow()
+
+            self.metrics["max_depth"] = max(self.metrics["max_depth"], self.depth)
+            self.not_empty.notify()
+
+        if self.on_put:
+            self.on_put()
+
+    def _handle_overflow(self):
+        """Bring the queue back within bounds. Called with the mutex held."""
+        if self.policy == POLICY_FAST_MODEL:
+            if not self.degraded:
+                self.degraded = True
+                self.metrics["degraded_periods"] += 1
+                log_message(f"Transcription queue full ({self.depth} chunks) - switching to fast model",
+                            self.session_id)
+            if self.depth <= 2 * self.maxsize:
+                return
+        elif self.policy == POLICY_MERGE and self._merge_oldest_pair():
+            return
+
+        oldest = min((chunks for chunks in self.chunks.values() if chunks),
+                     key=lambda chunks: chunks[0].capture_time or 0)
+        dropped = oldest.popleft()
+        self.depth -= 1
+        self._finish_task()
+        self.metrics["dropped"] += 1
+        log_message(f"Transcription queue full - dropped oldest chunk ({self.metrics['dropped']} dropped so far)",
+                    self.session_id)
+        if self.on_drop:
+            self.on_drop(dropped)
+
+    def _merge_oldest_pair(self):
+        """Merge the oldest two chunks from the same source; False if none can be merged."""
+        candidates = []
+        for chunks in self.chunks.values():
+            for i in range(len(chunks) - 1):
+                if chunks[i].duration + chunks[i + 1].duration <= MAX_MERGED_DURATION:
+                    candidates.append((chunks[i].capture_time or 0, chunks, i))
+                    break
+        if not candidates:
+            return False
+
+        _, chunks, i = min(candidates, key=lambda candidate: candidate[0])
+        chunks[i] = merge_chunks(chunks[i], chunks[i + 1])
+        del chunks[i + 1]
+        self.depth -= 1
+        self._finish_task()
+        self.metrics["merged"] += 1
+        return True
+
+    def _most_urgent(self, now, stale):
+        """Source queue whose oldest chunk has the earliest deadline, among the
+        sources whose oldest chunk is stale (or fresh). Called with the mutex held.
+        """
+        heads = [chunks for chunks in self.chunks.values()
+                 if chunks and (_deadline(chunks[0]) < now) == stale]
+        if not heads:
+            return None
+        return min(heads, key=lambda chunks: _deadline(chunks[0]))
+
+    def get(self, block=True, timeout=None):
+        """Remove and return the most urgent chunk; raises queue.Empty on timeout."""
+        return self.get_batch(1, block, timeout)[0]
+
+    def get_batch(self, max_chunks, block=True, timeout=None):
+        """Wait for a chunk, then take up to max_chunks in deadline order from what is queued.
+
+        A batch is either all fresh or all stale (flagged with chunk.stale);
+        stale chunks are only served when nothing fresh is queued or a full
+        batch of them is waiting. Raises queue.Empty on timeout. Never waits
+        for a batch to fill up.
+        """
+        with self.not_empty:
+            if not self.not_empty.wait_for(lambda: self.depth, timeout if block else 0):
+                raise queue.Empty
+
+            # Fresh chunks first, unless there are none or a full stale batch is waiting
+            now = time.time()
+            stale_count = sum(1 for chunks in self.chunks.values() for chunk in chunks if _deadline(chunk) < now)
+            stale = self._most_urgent(now, False) is None or stale_count >= max(1, max_chunks)
+
+            dequeued = time.monotonic()
+            batch = []
+            while len(batch) < max(1, max_chunks):
+                chunks = self._most_urgent(now, stale)
+                if chunks is None:
+                    break
+                chunk = chunks.popleft()
+                self.depth -= 1
+                chunk.stale = stale
+                chunk.timings["dequeued"] = dequeued
+
+                # Each source is dequeued in capture order; its results are committed in this order
+                chunk.sequence = self.next_sequence[chunk.source]
+                self.next_sequence[chunk.source] += 1
+                batch.append(chunk)
+
+            if stale:
+                self.metrics["stale_chunks"] += len(batch)
+            self.not_full.notify_all()
+
+            # Leave degraded mode once the backlog has halved
+            if self.degraded and self.depth <= self.maxsize // 2:
+                self.degraded = False
+                log_message("Transcription queue recovered - back to the main model", self.session_id)
+            return batch
+
+    def record(self, metric, count=1):
+        """Count a policy decision made outside the queue (e.g. a fast-model decode)."""
+        with self.mutex:
+            self.metrics[metric] = self.metrics.get(metric, 0) + count
+
+    def _finish_task(self):
+        """Mark one chunk as done. Called with the mutex held."""
+        self.unfinished_tasks -= 1
+        if self.unfinished_tasks <= 0:
+            self.all_tasks_done.notify_all()
+
+    def task_done(self):
+        with self.mutex:
+            self._finish_task()
+
+    def join(self):
+        with self.all_tasks_done:
+            self.all_tasks_done.wait_for(lambda: self.unfinished_tasks <= 0)
+
+    def empty(self):
+        with self.mutex:
+            return self.depth == 0
+
+    def qsize(self):
+        with self.mutex:
+            return self.depth
+
+    def get_metrics(self):
+        """Snapshot of the queue's depth, state and policy counters."""
+        with self.mutex:
+            metrics = dict(self.metrics)
+            metrics.update({
+                "depth": self.depth,
+                "depth_by_source": {source: len(chunks) for source, chunks in self.chunks.items()},
+                "maxsize": self.maxsize,
+                "policy": self.policy,
+                "degraded": self.degraded,
+                "saturated": self.depth >= self.maxsize
+            })
+            return metrics
+
+def _deadline(chunk):
+    """A chunk's deadline; chunks without one are never urgent."""
+    return chunk.deadline if chunk.deadline is not None else float("inf")
+
+def merge_chunks(first, second):
+    """Join two chunks from the same source into one."""
+    sample_rate = first.sample_rate
+    second_audio = second.audio
+    second_archive = second.archive_audio
+
+    # Chunks cut mid-speech already share an overlap; don't repeat it
+    if first.overlap_after and second.overlap_before:
+        second_audio = second_audio[int(second.overlap_before * sample_rate):]
+        if second_archive is not None:
+            second_archive = second_archive[int(second.overlap_before * second.archive_sample_rate):]
+
+    merged = AudioChunk(
+        f"{first.chunk_id}-{second.chunk_id.rsplit('_', 1)[-1]}",
+        first.source,
+        np.concatenate((first.audio, second_audio)),
+        sample_rate,
+        max(first.audio_level, second.audio_level),
+        first.capture_time,
+        stream_offset=first.stream_offset,
+        overlap_before=first.overlap_before,
+        overlap_after=second.overlap_after,
+        deadline=first.deadline
+    )
+    merged.timings = dict(first.timings)
+    if first.archive_audio is not None and second_archive is not None:
+        merged.archive_audio = np.concatenate((first.archive_audio, second_archive))
+        merged.archive_sample_rate = first.archive_sample_rate
+    return merged
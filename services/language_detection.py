@@ -0,0 +1,81 @@
+import threading
+from utils.audio_utils import log_message
+from config import (LANGUAGE, LANGUAGE_CONFIDENCE, LANGUAGE_DETECTION_CHUNKS,
+                    LANGUAGE_REDETECT, LANGUAGE_REDETECT_LOGPROB, LANGUAGE_REDETECT_CHUNKS)
+
+class LanguageTracker:
+    """
+    Keeps one transcription language per session.
+
+    With LANGUAGE set in config that language is used from the start.
+    Otherwise Whisper detects the language on the first chunks, and once
+    LANGUAGE_DETECTION_CHUNKS speech chunks in a row were detected as the
+    same language with at least LANGUAGE_CONFIDENCE probability it is pinned
+    and passed to every later decode, which skips detection.
+
+    A detected language is released again (if LANGUAGE_REDETECT is on) after
+    LANGUAGE_REDETECT_CHUNKS chunks in a row decode with an average log
+    probability below LANGUAGE_REDETECT_LOGPROB, e.g. when the meeting
+    switches language.
+    """
+    def __init__(self, session_id=None):
+        self.session_id = session_id
+        self.language = LANGUAGE
+        self.configured = LANGUAGE is not None
+        self.detections = []
+        self.low_confidence_run = 0
+        self.redetections = 0
+        self.lock = threading.Lock()
+
+    def decode_options(self):
+        """Extra transcribe() options: the pinned language, if any."""
+        with self.lock:
+            return {"language": self.language} if self.language else {}
+
+    def observe(self, language, probability, avg_logprob, pinned):
+        """Account for one decoded chunk.
+
+        pinned tells whether the decode was given a language; avg_logprob is
+        None for chunks without speech, which are ignored.
+        """
+        if avg_logprob is None:
+            return
+
+        with self.lock:
+            if not pinned:
+                self._detect(language, probability)
+            elif self.language and not self.configured:
+                self._check_confidence(avg_logprob)
+
+    def _detect(self, language, probability):
+        """Pin the language once enough confident detections agree. Called with the lock held."""
+        if self.language or probability < LANGUAGE_CONFIDENCE:
+            self.detections = []
+            return
+
+        self.detections.append(language)
+        recent = self.detections[-LANGUAGE_DETECTION_CHUNKS:]
+        if len(recent) == LANGUAGE_DETECTION_CHUNKS and len(set(recent)) == 1:
+            self.language = language
+            self.detections = []
+            self.low_confidence_run = 0
+            log_message(f"Transcription language pinned to '{language}' (probability {probability:.2f})",
+                        self.session_id)
+
+    def _check_confidence(self, avg_logprob):
+        """Release a detected language after a run of poorly decoded chunks. Called with the lock held."""
+        self.low_confidence_run = self.low_confidence_run + 1 if avg_logprob < LANGUAGE_REDETECT_LOGPROB else 0
+        if LANGUAGE_REDETECT and self.low_confidence_run >= LANGUAGE_REDETECT_CHUNKS:
+            log_message(f"Low decoding confidence with '{self.language}' for {self.low_confidence_run} chunks "
+                        f"- detecting the language again", self.session_id)
+            self.language = None
+            self.low_confidence_run = 0
+            self.redetections += 1
+
+    def get_state(self):
+        with self.lock:
+            return {
+                "language": self.language,
+                "source": "config" if self.configured else ("detected" if self.language else "detecting"),
+                "redetections": self.redetections
+            }
@@ -0,0 +1,143 @@
+import threading
+import time
+from utils.audio_utils import log_message
+from config import ASR_SAMPLE_RATE, PARTIAL_INTERVAL, PARTIAL_MIN_DURATION, PARTIAL_EXPIRY
+
+class PartialTranscriber:
+    """
+    Live captions for speech that has not been chunked yet.
+
+    Every PARTIAL_INTERVAL seconds the chunk each source is still collecting
+    is decoded again from its start. Consecutive hypotheses for the same
+    chunk are compared word by word (local agreement): words that two decodes
+    in a row agree on become stable and are never taken back, the rest of the
+    latest hypothesis is shown as unstable text. A partial is replaced by the
+    committed chunk once the transcriber has processed the audio it covers,
+    and removed as soon as its audio is discarded instead.
+
+    Partial decodes only start while the transcription queue is empty and no
+    batch is decoding. They share the model with the workers, though, so a
+    chunk queued while a partial decode runs waits for at most that one
+    decode.
+    """
+    def __init__(self, session):
+        self.session = session
+        self.lock = threading.Lock()
+
+        # (source, start position) -> partial state for one open chunk
+        self.partials = {}
+
+        # Stream position (seconds) up to which each source has committed text
+        self.committed_until = {}
+
+        self.thread = threading.Thread(target=self._run, name="partial-transcriber")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self):
+        log_message("Partial transcription started", self.session.session_id)
+
+        while self.session.is_recording:
+            time.sleep(PARTIAL_INTERVAL)
+            for source in list(self.session.recorder.sources):
+                try:
+                    self._update(source)
+                except Exception as e:
+                    log_message(f"Error in partial transcription of {source}: {str(e)}", self.session.session_id)
+            self._expire()
+
+    def _update(self, source):
+        """Re-decode a source's open chunk and fold the result into its partial."""
+        # Committed text comes first
+        if not self.session.transcription_queue.empty() or self.session.is_decoding():
+            return
+
+        segment = self.session.recorder.open_segment(source)
+        if segment is None:
+            return
+
+        audio, start_pos, capture_time = segment
+        if len(audio) < PARTIAL_MIN_DURATION * ASR_SAMPLE_RATE:
+            return
+
+        key = (source, start_pos)
+        with self.lock:
+            state = self.partials.get(key)
+            if state is not None and len(audio) <= state["decoded_frames"]:
+                return
+
+        words = self.session.decode_partial(audio)
+
+        with self.lock:
+            # The chunk may have been committed while we were decoding
+            if start_pos / float(ASR_SAMPLE_RATE) < self.committed_until.get(source, -1.0):
+                return
+
+            state = self.partials.setdefault(key, {
+                "source": source,
+                "start": start_pos / float(ASR_SAMPLE_RATE),
+                "capture_time": capture_time,
+                "stable": [],
+                "unstable": [],
+                "previous": []
+            })
+            state["decoded_frames"] = len(audio)
+            state["updated"] = time.monotonic()
+            self._agree(state, words)
+
+    def _agree(self, state, words):
+        """Promote words two consecutive hypotheses agree on to stable text.
+
+        words is a list of (word, normalized word) pairs. Stable words are
+        never revised; only the part of the hypothesis after them is compared.
+        """
+        tail = words[len(state["stable"]):]
+        previous = state["previous"]
+
+        agreed = 0
+        while agreed < min(len(tail), len(previous)) and tail[agreed][1] == previous[agreed][1]:
+            agreed += 1
+
+        state["stable"] = state["stable"] + tail[:agreed]
+        state["unstable"] = tail[agreed:]
+        state["previous"] = tail[agreed:]
+
+    def commit(self, source, stream_end):
+        """Drop the partials a committed (or discarded) chunk of `source` ending at stream_end replaces."""
+        with self.lock:
+            self.committed_until[source] = max(self.committed_until.get(source, -1.0), stream_end)
+            for key, state in list(self.partials.items()):
+                if state["source"] == source and state["start"] < stream_end:
+                    del self.partials[key]
+
+    def _expire(self):
+        """Forget partials whose chunk was never committed nor reported as discarded."""
+        now = time.monotonic()
+        with self.lock:
+            for key, state in list(self.partials.items()):
+                if now - state["updated"] > PARTIAL_EXPIRY:
+                    del self.partials[key]
+
+    def get_partials(self):
+        """Current partial captions, oldest first."""
+        with self.lock:
+            states = sorted(self.partials.values(), key=lambda state: state["capture_time"])
+            partials = []
+            for state in states:
+                stable = " ".join(word for word, _ in state["stable"])
+                unstable = " ".join(word for word, _ in state["unstable"])
+                if not stable and not unstable:
+                    continue
+                partials.append({
+                    "source": state["source"],
+                    "timestamp": time.strftime("%H:%M:%S", time.localtime(state["capture_time"])),
+                    "stable": stable,
+                    "unstable": unstable,
+                    "text": " ".join(part for part in (stable, unstable) if part),
+                    "display_speaker": "You" if state["source"] == "mic" else "Speaker",
+                    "partial": True
+                })
+            return partials
+
+    def join(self, timeout=None):
+        self.thread.join(timeout)
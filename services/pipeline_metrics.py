@@ -0,0 +1,91 @@
+import collections
+import threading
+import numpy as np
+from config import PIPELINE_METRICS_WINDOW, LATENCY_HISTOGRAM_BUCKETS, RTF_HISTOGRAM_BUCKETS
+
+# Pipeline stages as (name, mark at its start, mark at its end). Marks are
+# time.monotonic() values stored in AudioChunk.timings as the chunk moves along.
+STAGES = (
+    ("capture", "captured", "queued"),        # last sample -> chunk cut and queued (VAD, cross-talk check)
+    ("queue_wait", "queued", "dequeued"),     # waiting for a transcription worker
+    ("whisper", "dequeued", "decoded"),       # resampling, cache lookup and decoding
+    ("reorder", "decoded", "delivered"),      # waiting for earlier chunks of the same source
+    ("diarization", "delivered", "diarized"),
+    ("write_behind", "diarized", "flushing"), # waiting for the result writer's next flush
+    ("sqlite", "flushing", "stored"),
+    ("transcript", "stored", "appended")      # transcript file append
+)
+
+class PipelineMetrics:
+    """
+    Rolling per-stage latency and real-time factor statistics for one session.
+
+    Each finished chunk contributes the time it spent in every stage it went
+    through (chunks without speech stop after "reorder") and its end-to-end
+    latency from its last captured sample to being persisted. Retained-audio
+    writes happen on the archiver's thread and are recorded separately as
+    "archive". Only the last PIPELINE_METRICS_WINDOW samples of each series
+    are kept.
+    """
+    def __init__(self, window=PIPELINE_METRICS_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+        self.rtf = collections.deque(maxlen=self.window)
+        self.chunks = 0
+
+    def record(self, stage, seconds):
+        """Add one duration (seconds) to a stage's series."""
+        with self.lock:
+            self.samples[stage].append(seconds)
+
+    def record_rtf(self, decode_seconds, audio_seconds):
+        """Add the real-time factor of one decode (decode time / audio time)."""
+        if audio_seconds <= 0:
+            return
+        with self.lock:
+            self.rtf.append(decode_seconds / audio_seconds)
+
+    def record_chunk(self, chunk):
+        """Add the stage durations of a chunk that has been through the pipeline."""
+        timings = chunk.timings
+        with self.lock:
+            self.chunks += 1
+            for stage, start, end in STAGES:
+                if start in timings and end in timings:
+                    self.samples[stage].append(timings[end] - timings[start])
+            if "captured" in timings:
+                self.samples["total"].append(max(timings.values()) - timings["captured"])
+
+    def get_metrics(self):
+        """Percentiles and histograms of every series."""
+        with self.lock:
+            stages = [stage for stage, _, _ in STAGES] + ["archive", "total"]
+            return {
+                "window": self.window,
+                "chunks": self.chunks,
+                "stages": {
+                    stage: _summarize(self.samples[stage], LATENCY_HISTOGRAM_BUCKETS)
+                    for stage in stages if self.samples.get(stage)
+                },
+                "rtf": _summarize(self.rtf, RTF_HISTOGRAM_BUCKETS) if self.rtf else None
+            }
+
+def _summarize(values, buckets):
+    """Count, mean, p50/p95/p99, max and a bucketed histogram of a series."""
+    values = np.asarray(values, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+
+    # Bucket i counts values <= buckets[i] (and above the previous edge); the last one is overflow
+    counts = np.bincount(np.searchsorted(buckets, values, side="left"), minlength=len(buckets) + 1)
+    labels = [f"<={edge}" for edge in buckets] + [f">{buckets[-1]}"]
+
+    return {
+        "count": len(values),
+        "mean": round(float(values.mean()), 4),
+        "p50": round(float(p50), 4),
+        "p95": round(float(p95), 4),
+        "p99": round(float(p99), 4),
+        "max": round(float(values.max()), 4),
+        "histogram": dict(zip(labels, counts.tolist()))
+    }
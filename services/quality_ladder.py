@@ -0,0 +1,79 @@
+import threading
+from utils.audio_utils import log_message
+from config import (QUALITY_LADDER, LADDER_MIN_LEVEL, LADDER_MAX_LEVEL, LADDER_STEP_DOWN_RTF,
+                    LADDER_STEP_UP_RTF, LADDER_STEP_DOWN_QUEUE, LADDER_COOLDOWN)
+
+class QualityLadder:
+    """
+    Picks decoding settings from QUALITY_LADDER based on how well the
+    transcriber keeps up.
+
+    After every decode the real-time factor (decode time / audio time, per
+    worker) is folded into a moving average. The ladder steps down to a
+    cheaper level when that average or the queue depth says we are falling
+    behind, and back up when decoding is comfortably faster than real time
+    and the queue is empty. Levels stay within [LADDER_MIN_LEVEL,
+    LADDER_MAX_LEVEL], and LADDER_COOLDOWN decodes must pass between changes
+    so a single slow chunk doesn't make it oscillate.
+    """
+    def __init__(self, num_workers=1, session_id=None):
+        self.num_workers = max(1, num_workers)
+        self.session_id = session_id
+        self.min_level = max(0, LADDER_MIN_LEVEL)
+        self.max_level = min(len(QUALITY_LADDER) - 1, LADDER_MAX_LEVEL)
+        self.level = self.min_level
+        self.rtf = None
+        self.decodes_since_change = 0
+        self.level_changes = 0
+        self.lock = threading.Lock()
+
+    def current(self):
+        """Settings for the current level."""
+        with self.lock:
+            return QUALITY_LADDER[self.level]
+
+    def uses_model(self, model_name):
+        """Whether any allowed level decodes with the given model."""
+        return any(QUALITY_LADDER[level].get("model") == model_name
+                   for level in range(self.min_level, self.max_level + 1))
+
+    def record(self, decode_seconds, audio_seconds, queue_depth):
+        """Fold one decode into the moving average and adjust the level."""
+        if audio_seconds <= 0:
+            return
+
+        with self.lock:
+            # Workers decode in parallel, so each one only has to keep up with its share
+            rtf = decode_seconds / audio_seconds / self.num_workers
+            self.rtf = rtf if self.rtf is None else 0.7 * self.rtf + 0.3 * rtf
+            self.decodes_since_change += 1
+
+            if self.decodes_since_change < LADDER_COOLDOWN:
+                return
+
+            falling_behind = self.rtf > LADDER_STEP_DOWN_RTF or queue_depth >= LADDER_STEP_DOWN_QUEUE
+            idle = self.rtf < LADDER_STEP_UP_RTF and queue_depth == 0
+
+            if falling_behind and self.level < self.max_level:
+                self._change_level(self.level + 1, queue_depth)
+            elif idle and self.level > self.min_level:
+                self._change_level(self.level - 1, queue_depth)
+
+    def _change_level(self, level, queue_depth):
+        """Switch level. Called with the lock held."""
+        direction = "down" if level > self.level else "up"
+        self.level = level
+        self.decodes_since_change = 0
+        self.level_changes += 1
+        log_message(f"Decoding quality stepped {direction} to level {level} {QUALITY_LADDER[level]} "
+                    f"(RTF {self.rtf:.2f}, queue {queue_depth})", self.session_id)
+
+    def get_state(self):
+        """Current level, settings and real-time factor."""
+        with self.lock:
+            return {
+                "level": self.level,
+                "settings": QUALITY_LADDER[self.level],
+                "rtf": round(self.rtf, 3) if self.rtf is not None else None,
+                "level_changes": self.level_changes
+            }
@@ -0,0 +1,112 @@
+import queue
+import sqlite3
+import threading
+import time
+from utils.audio_utils import log_message
+from config import DB_PATH, RESULT_FLUSH_INTERVAL, RESULT_FLUSH_MAX
+
+class ResultWriter:
+    """
+    Write-behind persistence of transcribed chunks on a background thread.
+
+    The transcriber hands over each chunk's database rows and transcript
+    line and goes straight back to decoding. The writer collects whatever
+    arrives within RESULT_FLUSH_INTERVAL of the first pending result (at
+    most RESULT_FLUSH_MAX of them) and stores it with one transaction and
+    one transcript file append, on its own long-lived connection.
+
+    Stamps the "flushing", "stored" and "appended" marks of every chunk and
+    reports it to `metrics` (a PipelineMetrics) once it is written, if given.
+    """
+    def __init__(self, session_id, transcript_file, metrics=None):
+        self.session_id = session_id
+        self.transcript_file = transcript_file
+        self.metrics = metrics
+        self.write_queue = queue.Queue()
+        self.flushes = 0
+
+        self.writer_thread = threading.Thread(target=self._write_results, name="result-writer")
+        self.writer_thread.daemon = True
+        self.writer_thread.start()
+
+    def save(self, chunk, chunk_row, word_rows, transcript_line):
+        """Queue one chunk's row, word rows and transcript line for writing."""
+        self.write_queue.put((chunk, chunk_row, word_rows, transcript_line))
+
+    def _next_batch(self):
+        """Wait for a result, then collect what arrives within the flush interval.
+
+        Returns (results, closed).
+        """
+        item = self.write_queue.get()
+        if item is None:
+            return [], True
+
+        batch = [item]
+        flush_at = time.monotonic() + RESULT_FLUSH_INTERVAL
+        while len(batch) < RESULT_FLUSH_MAX:
+            try:
+                item = self.write_queue.get(timeout=max(0.0, flush_at - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write_results(self):
+        """Write batches of results until closed."""
+        conn = sqlite3.connect(DB_PATH)
+        closed = False
+        while not closed:
+            batch, closed = self._next_batch()
+            try:
+                if batch:
+                    self._flush(conn, batch)
+            except Exception as e:
+                log_message(f"Error storing {len(batch)} transcribed chunks: {str(e)}", self.session_id)
+            finally:
+                # The closing None counts as a task too
+                for _ in range(len(batch) + (1 if closed else 0)):
+                    self.write_queue.task_done()
+        conn.close()
+
+    def _flush(self, conn, batch):
+        """Store a batch in one transaction, then append its lines to the transcript."""
+        flushing = time.monotonic()
+        for chunk, _, _, _ in batch:
+            chunk.timings["flushing"] = flushing
+
+        with conn:
+            # Chunks that are already stored are left alone
+            conn.executemany(
+                "INSERT OR IGNORE INTO chunks (chunk_id, session_id, timestamp, text, audio_path, source, speaker_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [chunk_row for _, chunk_row, _, _ in batch]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO words (chunk_id, word_index, word, start_time, end_time, probability, "
+                "char_start, char_end) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [word_row for _, _, word_rows, _ in batch for word_row in word_rows]
+            )
+        stored = time.monotonic()
+
+        with open(self.transcript_file, "a", encoding="utf-8") as f:
+            f.write("".join(f"{line}\n" for _, _, _, line in batch))
+        appended = time.monotonic()
+
+        self.flushes += 1
+        for chunk, _, _, _ in batch:
+            chunk.timings["stored"] = stored
+            chunk.timings["appended"] = appended
+            if self.metrics:
+                self.metrics.record_chunk(chunk)
+
+    def flush(self):
+        """Block until everything queued so far is written."""
+        self.write_queue.join()
+
+    def close(self):
+        """Write pending results and stop the writer thread."""
+        self.write_queue.put(None)
+        self.writer_thread.join()
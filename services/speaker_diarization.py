@@ -33,11 +33,14 @@ class SpeakerDiarizer:
                 self.speaker_embeddings = {}
                 self.speaker_counter = 0
     
-    def extract_embedding(self, audio_path):
-        """Extract voice embedding from audio file"""
+    def extract_embedding(self, audio, sample_rate=None):
+        """Extract voice embedding from an audio array or audio file"""
         try:
-            # Load audio file
-            y, sr = librosa.load(audio_path, sr=None)
+            # Load audio file only when given a path; in-memory audio is used as-is
+            if isinstance(audio, str):
+                y, sr = librosa.load(audio, sr=None)
+            else:
+                y, sr = np.asarray(audio, dtype=np.float32), sample_rate
             
             # Normalize audio
             y = librosa.util.normalize(y)
@@ -57,14 +60,14 @@ class SpeakerDiarizer:
             print(f"Error extracting embedding: {e}")
             return None
     
-    def identify_speaker(self, audio_path, source):
-        """Identify the speaker from an audio chunk"""
+    def identify_speaker(self, audio, source, sample_rate=None):
+        """Identify the speaker from an audio chunk (array with sample_rate, or file path)"""
         # Only process speaker source audio (not microphone)
         if source != "speaker":
             return None
             
         # Extract voice embedding from the audio chunk
-        embedding = self.extract_embedding(audio_path)
+        embedding = self.extract_embedding(audio, sample_rate)
         
         if embedding is None:
             print("Failed to extract embedding")
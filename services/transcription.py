@@ -1,62 +1,281 @@
 from faster_whisper import WhisperModel
 import threading
-import queue
+import collections
 import os
 import time
-import shutil
 import sqlite3
 import numpy as np
-import soundfile as sf
-from utils.audio_utils import log_message
-from config import DB_PATH, SAMPLE_RATE, CHUNK_DURATION
+from utils.audio_utils import log_message, resample_audio
+from config import (DB_PATH, SAMPLE_RATE, CHUNK_DURATION, ASR_SAMPLE_RATE, RETAIN_AUDIO,
+                    TRANSCRIPTION_QUEUE_SIZE, QUEUE_FULL_POLICY, FAST_MODEL_SIZE,
+                    MODEL_SIZE, USE_CUDA, DEVICE, CUDA_COMPUTE_TYPE, CPU_COMPUTE_TYPE, CPU_THREADS,
+                    TRANSCRIPTION_WORKERS, PARTIAL_TRANSCRIPTION,
+                    TRANSCRIPTION_CACHE, TRANSCRIPTION_CACHE_PATH, TRANSCRIPTION_CACHE_MAX_MB,
+                    VAD_FILTER, SEGMENT_NO_SPEECH_PROB, DEFAULT_SESSION_WEIGHT, SESSION_MAX_CONCURRENCY,
+                    QUALITY_LADDER)
 from services.audio_recorder import ContinuousRecorder
+from services.chunk_queue import ChunkQueue, POLICY_FAST_MODEL
+from services.audio_archiver import AudioArchiver
+from services.quality_ladder import QualityLadder
+from services.partial_transcription import PartialTranscriber
+from services.transcription_cache import TranscriptionCache
+from services.language_detection import LanguageTracker
+from services.asr_scheduler import ASRScheduler
+from services.pipeline_metrics import PipelineMetrics
+from services.result_writer import ResultWriter
 from services.speaker_diarization import SpeakerDiarizer
 from database.db_utils import get_chunks_from_db, get_latest_session_id, get_audio_path
 
 # Transcription model (initialized on demand)
 model = None
-model_size = "large-v3"
+model_size = MODEL_SIZE
 
-# Global session storage
-active_session = None
+# Smaller model used while the transcription queue is saturated
+fast_model = None
+
+# Batched inference pipelines, one per loaded model
+batched_pipelines = {}
+
+# Persistent cache of transcription results, shared by all sessions
+transcription_cache = None
+
+# Background model loading: the lock keeps a session start and the preloader
+# from loading the same model twice
+model_lock = threading.Lock()
+model_ready = threading.Event()
+model_load_error = None
+
+# Word timing relative to the start of its chunk's audio
+WordTiming = collections.namedtuple("WordTiming", ["word", "start", "end", "probability"])
+
+# Decoding settings shared by single and batched transcription; the quality
+# ladder overrides beam_size per decode
+DECODE_OPTIONS = {
+    "beam_size": 10,              # Better transcription quality
+    "temperature": 0.0,           # Deterministic output
+    "no_speech_threshold": 0.6,   # More sensitive speech detection
+    "word_timestamps": True,      # Generate timestamps for words
+    "vad_filter": VAD_FILTER      # Skip decoding audio without speech
+}
+
+# Whisper decodes 30 s windows; a batched chunk is padded to exactly one
+BATCH_WINDOW = 30
+
+# Batching relies on clip_timestamps in seconds, as read from faster-whisper 1.2
+MIN_BATCHED_VERSION = (1, 2)
+BATCH_WINDOW_SAMPLES = BATCH_WINDOW * ASR_SAMPLE_RATE
+
+# Running sessions by session_id, most recently started last
+sessions = {}
+sessions_lock = threading.Lock()
+
+# Transcript files of sessions that are running or still starting up
+FIXED_TRANSCRIPT_FILE = "transcriptions/transcription.txt"
+claimed_transcript_files = set()
+
+# Transcription workers shared by all sessions (started with the first session)
+scheduler = None
+
+def cuda_device_count():
+    """Number of GPUs CTranslate2 can use (0 if CUDA is unavailable)"""
+    try:
+        import ctranslate2
+        return ctranslate2.get_cuda_device_count()
+    except Exception as e:
+        log_message(f"Could not query CUDA devices: {e}")
+        return 0
+
+def select_device():
+    """Pick the inference device from config, falling back to CPU without a GPU"""
+    if DEVICE in ("cuda", "cpu"):
+        return DEVICE
+    if USE_CUDA and cuda_device_count() > 0:
+        return "cuda"
+    return "cpu"
+
+def cpu_threads_per_worker():
+    """Intra-op threads for each transcription worker on CPU"""
+    if CPU_THREADS:
+        return CPU_THREADS
+    # Split the cores between workers instead of oversubscribing them (a lone
+    # worker gets them all rather than CTranslate2's default of 4)
+    return max(1, (os.cpu_count() or 1) // TRANSCRIPTION_WORKERS)
+
+def load_whisper_model(size, num_workers=TRANSCRIPTION_WORKERS, cpu_threads=None, device_index=0):
+    """Load a Whisper model on the selected device with its configured compute type.
+    
+    num_workers lets that many threads decode in parallel on one model; cpu_threads
+    defaults to an even share of the cores per worker. device_index picks the GPU.
+    """
+    device = select_device()
+    if device == "cuda":
+        log_message(f"Loading Whisper model {size} on CUDA:{device_index} ({CUDA_COMPUTE_TYPE}, "
+                    f"{num_workers} workers)...")
+        return WhisperModel(size, device="cuda", device_index=device_index, compute_type=CUDA_COMPUTE_TYPE,
+                            num_workers=num_workers)
+    
+    if cpu_threads is None:
+        cpu_threads = cpu_threads_per_worker()
+    log_message(f"Loading Whisper model {size} on CPU ({CPU_COMPUTE_TYPE}, {num_workers} workers x "
+                f"{cpu_threads} threads)...")
+    return WhisperModel(size, device="cpu", compute_type=CPU_COMPUTE_TYPE, cpu_threads=cpu_threads,
+                        num_workers=num_workers)
 
 def initialize_model():
     """Initialize the Whisper model"""
     global model
-    if model is None:
-        log_message(f"Loading Whisper model {model_size}...")
-        model = WhisperModel(model_size, device="cuda", compute_type="float16")
-        log_message("Model loaded successfully!")
+    with model_lock:
+        if model is None:
+            model = load_whisper_model(model_size)
+            log_message("Model loaded successfully!")
     return model
 
+def initialize_fast_model():
+    """Initialize the fast fallback Whisper model"""
+    global fast_model
+    with model_lock:
+        if fast_model is None:
+            fast_model = load_whisper_model(FAST_MODEL_SIZE)
+            log_message("Fast model loaded successfully!")
+    return fast_model
+
+def warm_up_model(whisper_model):
+    """Run one throwaway decode so the first real chunk doesn't pay for kernel setup"""
+    start = time.monotonic()
+    audio = (0.01 * np.sin(2 * np.pi * 440 * np.arange(ASR_SAMPLE_RATE) / ASR_SAMPLE_RATE)).astype(np.float32)
+    # The VAD would strip the quiet tone and the decoder would never run
+    segments, info = whisper_model.transcribe(audio, **dict(DECODE_OPTIONS, vad_filter=False))
+    list(segments)
+    log_message(f"Model warmed up in {time.monotonic() - start:.1f}s")
+
+def _preload_models():
+    """Load and warm up every model sessions will need"""
+    global model_load_error
+    try:
+        warm_up_model(initialize_model())
+        if QUEUE_FULL_POLICY == POLICY_FAST_MODEL or QualityLadder().uses_model("fast"):
+            warm_up_model(initialize_fast_model())
+        get_transcription_cache()
+        model_ready.set()
+        log_message("Transcription models ready")
+    except Exception as e:
+        model_load_error = str(e)
+        log_message(f"Error preloading models: {e}")
+
+def preload_models():
+    """Start loading the models in the background so the first session starts instantly"""
+    thread = threading.Thread(target=_preload_models, name="model-preloader")
+    thread.daemon = True
+    thread.start()
+    return thread
+
+def get_model_status():
+    """Whether starting a session will be instant"""
+    return {
+        "ready": model_ready.is_set(),
+        "loading": not model_ready.is_set() and model_load_error is None,
+        "error": model_load_error
+    }
+
+def get_transcription_cache():
+    """Open the transcription cache, or None if caching is off"""
+    global transcription_cache
+    if TRANSCRIPTION_CACHE and transcription_cache is None:
+        transcription_cache = TranscriptionCache(TRANSCRIPTION_CACHE_PATH, TRANSCRIPTION_CACHE_MAX_MB * 1024 * 1024)
+    return transcription_cache
+
+def get_batched_pipeline(whisper_model):
+    """Batched inference pipeline for a model, or None if faster-whisper is older than MIN_BATCHED_VERSION"""
+    key = id(whisper_model)
+    if key not in batched_pipelines:
+        import faster_whisper
+        version = tuple(int(part) for part in faster_whisper.__version__.split(".")[:2] if part.isdigit())
+        if version < MIN_BATCHED_VERSION:
+            log_message(f"faster-whisper {faster_whisper.__version__} is older than "
+                        f"{'.'.join(map(str, MIN_BATCHED_VERSION))} - batching disabled")
+            batched_pipelines[key] = None
+        else:
+            batched_pipelines[key] = faster_whisper.BatchedInferencePipeline(model=whisper_model)
+    return batched_pipelines[key]
+
+def is_speech(segment):
+    """Whether a decoded segment is speech rather than a hallucination over noise"""
+    return segment.no_speech_prob <= SEGMENT_NO_SPEECH_PROB and segment.text.strip() != ""
+
+def _normalize_word(word):
+    """Normalize a word for boundary comparison"""
+    return word.strip().strip(".,!?;:\"'").lower()
+
+def word_offsets(text, words):
+    """(char_start, char_end) of each word in text, or (None, None) where a word can't be found"""
+    offsets = []
+    position = 0
+    for w in words:
+        token = w.word.strip()
+        start = text.find(token, position) if token else -1
+        if start < 0:
+            offsets.append((None, None))
+            continue
+        offsets.append((start, start + len(token)))
+        position = start + len(token)
+    return offsets
+
 class TranscriptionSession:
-    def __init__(self, session_id=None):
+    def __init__(self, session_id=None, sources=None, weight=DEFAULT_SESSION_WEIGHT,
+                 max_concurrency=SESSION_MAX_CONCURRENCY, transcript_file=None):
         self.session_id = session_id if session_id else str(os.urandom(16).hex())
-        self.transcription_queue = queue.Queue()
+        
+        # Fair-share weight and concurrency limit in the shared ASR scheduler
+        self.weight = weight
+        self.max_concurrency = max(1, min(max_concurrency, TRANSCRIPTION_WORKERS))
+        
+        # Bounded queue; QUEUE_FULL_POLICY decides what happens when Whisper falls behind
+        self.transcription_queue = ChunkQueue(TRANSCRIPTION_QUEUE_SIZE, QUEUE_FULL_POLICY, self.session_id)
         self.is_recording = True
-        self.temp_dir = f"temp_{self.session_id}"
         
         # Maintain a list of all chunks for both sources
         self.all_chunks = []
         
+        # Chunks that turned out to hold no speech; counted, never stored
+        self.silent_chunks = 0
+        
         # Separate chunk tracking for convenience
         self.mic_chunks = []
         self.speaker_chunks = []
         
+        # Last word of each source's previous chunk, for overlap stitching
+        self.boundary_words = {}
+        
         # Combined transcript
         self.combined_transcript = []  # List of (timestamp, speaker, text) tuples for sorting
         
-        # FIXED FILE PATH: Always use the same file name in the transcriptions directory
-        self.combined_transcript_file = "transcriptions/transcription.txt"
+        # FIXED FILE PATH: Always use the same file name in the transcriptions directory,
+        # unless another session is already writing to it
+        self.combined_transcript_file = transcript_file or FIXED_TRANSCRIPT_FILE
         
         # Ensure the transcriptions directory exists
         os.makedirs("transcriptions", exist_ok=True)
         
-        # Create temp directory for this session
-        os.makedirs(self.temp_dir, exist_ok=True)
+        # Rolling per-stage latency of every chunk through the pipeline
+        self.pipeline_metrics = PipelineMetrics()
+        
+        # Chunk audio is written once, in the background, and only if retained
+        self.audio_archiver = AudioArchiver(self.session_id, metrics=self.pipeline_metrics) if RETAIN_AUDIO else None
+        
+        # Results are stored and appended to the transcript in the background, in batches
+        self.result_writer = ResultWriter(self.session_id, self.combined_transcript_file, self.pipeline_metrics)
+        
+        # Decoding quality adapts to how well the workers keep up with real time
+        self.quality_ladder = QualityLadder(self.max_concurrency, self.session_id)
+        
+        # Language detection runs only until the session's language is known
+        self.language_tracker = LanguageTracker(self.session_id)
         
         # Ensure model is initialized
         initialize_model()
+        get_transcription_cache()
+        if QUEUE_FULL_POLICY == POLICY_FAST_MODEL or self.quality_ladder.uses_model("fast"):
+            initialize_fast_model()
         
         # Initialize the speaker diarizer
         self.speaker_diarizer = SpeakerDiarizer(self.session_id)
@@ -79,143 +298,348 @@ class TranscriptionSession:
         conn.commit()
         conn.close()
         
-        log_message(f"Session created. Temp directory: {self.temp_dir}", self.session_id)
+        log_message(f"Session created. Audio retention: {'on' if RETAIN_AUDIO else 'off'}", self.session_id)
         log_message(f"Combined transcript file: {self.combined_transcript_file}", self.session_id)
         
-        # Start continuous recorder
-        self.recorder = ContinuousRecorder(self)
+        # Live captions start once the recorder is running
+        self.partial_transcriber = None
+        
+        # Start continuous recorder (soundcard devices unless other sources are given)
+        self.recorder = ContinuousRecorder(self, sources)
         
-        # Start transcription thread
-        self.transcription_thread = threading.Thread(target=self._transcribe_chunks)
-        self.transcription_thread.daemon = True
-        self.transcription_thread.start()
+        # Each source's results are committed in capture order even when workers finish out of order
+        self.delivery_lock = threading.Lock()
+        self.pending_results = {}
+        self.next_sequence = collections.defaultdict(int)
+        
+        # Live captions for speech that is still being recorded
+        self.partial_transcriber = PartialTranscriber(self) if PARTIAL_TRANSCRIPTION else None
+        self.transcription_queue.on_drop = lambda chunk: self.discard_partial(
+            chunk.source, chunk.stream_offset + chunk.duration)
         
         log_message("Dual-source recording with speaker diarization started", self.session_id)
         
-    def _transcribe_chunks(self):
-        """Transcribes audio chunks with source identification and speaker diarization."""
-        log_message("Transcription thread started", self.session_id)
+    def process_batch(self, chunks):
+        """Transcribe a batch taken from this session's queue and hand the results over for in-order commit.
         
-        while self.is_recording or not self.transcription_queue.empty():
-            try:
-                try:
-                    # Get chunk file with timeout
-                    chunk_file, chunk_id, audio_level, source = self.transcription_queue.get(timeout=1)
-                except queue.Empty:
-                    continue
-                
-                log_message(f"Transcribing {source} chunk {chunk_id}", self.session_id)
-                
-                # Create a globally unique chunk ID
-                unique_chunk_id = f"{self.session_id}_{chunk_id}"
-                
-                # Transcribe the chunk
-                segments, info = model.transcribe(
-                    chunk_file, 
-                    beam_size=10,              # Better transcription quality
-                    temperature=0.0,           # Deterministic output
-                    no_speech_threshold=0.6,   # More sensitive speech detection
-                    word_timestamps=True       # Generate timestamps for words
-                )
-                
-                # Extract text
-                segment_texts = []
-                for segment in segments:
-                    segment_texts.append(segment.text.strip())
-                
-                # Process regardless of content
-                transcription_text = " ".join(segment_texts) if segment_texts else "[silence]"
-                timestamp = time.strftime("%H:%M:%S")
-                
-                # Save the audio file permanently
-                permanent_audio_path = f"audio_chunks/{self.session_id}_{chunk_id}.wav"
-                shutil.copy2(chunk_file, permanent_audio_path)
-                
-                # Identify the speaker for this chunk if it's from speaker source
-                speaker_id = None
-                if source == "speaker" and transcription_text != "[silence]":
-                    speaker_id = self.speaker_diarizer.identify_speaker(chunk_file, source)
-                    if speaker_id:
-                        log_message(f"Identified {speaker_id} for chunk {chunk_id}", self.session_id)
-                
-                # Check if this chunk already exists in the database
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                
-                # Add speaker_id column if it doesn't exist
-                cursor.execute("PRAGMA table_info(chunks)")
-                columns = cursor.fetchall()
-                speaker_id_exists = any(col[1] == 'speaker_id' for col in columns)
-                
-                if not speaker_id_exists:
-                    cursor.execute("ALTER TABLE chunks ADD COLUMN speaker_id TEXT")
-                    conn.commit()
-                
-                cursor.execute("SELECT chunk_id FROM chunks WHERE chunk_id = ?", (unique_chunk_id,))
-                existing_chunk = cursor.fetchone()
-                
-                # Only insert if this chunk doesn't already exist
-                if not existing_chunk:
-                    # Add to database with source and speaker info
-                    cursor.execute(
-                        "INSERT INTO chunks (chunk_id, session_id, timestamp, text, audio_path, source, speaker_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                        (unique_chunk_id, self.session_id, timestamp, transcription_text, permanent_audio_path, source, speaker_id)
-                    )
-                    conn.commit()
-                    
-                    # Create a display name for the speaker
-                    display_speaker = "You" if source == "mic" else (speaker_id if speaker_id else "Speaker")
-                    
-                    # Only add to transcripts if not silence
-                    if transcription_text != "[silence]":
-                        # Create chunk info for storage
-                        chunk_info = {
-                            "text": transcription_text,
-                            "timestamp": timestamp,
-                            "chunk_id": unique_chunk_id,
-                            "audio_path": permanent_audio_path,
-                            "source": source,
-                            "speaker_id": speaker_id,
-                            "display_speaker": display_speaker
-                        }
-                        
-                        # Add to appropriate chunk lists
-                        self.all_chunks.append(chunk_info)
-                        
-                        if source == "mic":
-                            self.mic_chunks.append(chunk_info)
-                        elif source == "speaker":
-                            self.speaker_chunks.append(chunk_info)
-                        
-                        # Add to combined transcript list
-                        self.combined_transcript.append((timestamp, display_speaker, transcription_text))
-                        
-                        # Immediately append to transcript file
-                        with open(self.combined_transcript_file, "a", encoding="utf-8") as f:
-                            f.write(f"[{timestamp}] {display_speaker}: {transcription_text}\n")
-                        
-                        log_message(f"Transcribed {source} {display_speaker}: {transcription_text}", self.session_id)
-                else:
-                    log_message(f"Chunk {unique_chunk_id} already exists in database, skipping", self.session_id)
-                
-                conn.close()
-                
-                # Mark as done
+        Called by the shared ASR scheduler's workers.
+        """
+        results = [None] * len(chunks)
+        try:
+            decode_start = time.monotonic()
+            results = self._transcribe(chunks)
+            decoded = time.monotonic()
+            for chunk in chunks:
+                chunk.timings["decoded"] = decoded
+            self.pipeline_metrics.record_rtf(decoded - decode_start, sum(chunk.duration for chunk in chunks))
+            
+            # Feed the real-time factor back into the quality ladder (the cheap stale pass
+            # says nothing about how the current level keeps up)
+            if not any(chunk.stale for chunk in chunks):
+                self.quality_ladder.record(decoded - decode_start,
+                                           sum(chunk.duration for chunk in chunks),
+                                           self.transcription_queue.qsize())
+        except Exception as e:
+            log_message(f"Error in transcription: {str(e)}", self.session_id)
+        finally:
+            # Always deliver, even on failure, so later chunks are not held back
+            for chunk, result in zip(chunks, results):
+                self._deliver_in_order(chunk, result)
                 self.transcription_queue.task_done()
+    
+    def _select_model(self, num_chunks=1, stale=False):
+        """Model and decode options for the next decode.
+        
+        The quality ladder picks the model and beam size; stale chunks (already
+        past their deadline) always get its cheapest allowed level, and a saturated
+        queue under the fast_model policy forces the fast model regardless. Once the
+        session's language is known it is passed along so Whisper skips detection.
+        """
+        level = QUALITY_LADDER[self.quality_ladder.max_level] if stale else self.quality_ladder.current()
+        options = dict(DECODE_OPTIONS, beam_size=level.get("beam_size", DECODE_OPTIONS["beam_size"]))
+        options.update(self.language_tracker.decode_options())
+        
+        if self.transcription_queue.degraded:
+            self.transcription_queue.record("fast_model_chunks", num_chunks)
+            return initialize_fast_model(), options
+        if level.get("model") == "fast":
+            return initialize_fast_model(), options
+        return model, options
+    
+    def _transcribe(self, chunks):
+        """Transcribe chunks, one (16 kHz audio, segment texts, words) result per chunk.
+        
+        Chunks whose audio was already decoded with the same model and options
+        are answered from the transcription cache; the rest go to Whisper,
+        batched when there are several.
+        """
+        active_model, options = self._select_model(len(chunks), any(chunk.stale for chunk in chunks))
+        model_name = FAST_MODEL_SIZE if active_model is fast_model else model_size
+        
+        # Whisper and the diarizer both work on 16 kHz samples
+        audios = [resample_audio(chunk.audio, chunk.sample_rate, ASR_SAMPLE_RATE) for chunk in chunks]
+        
+        cache = get_transcription_cache()
+        keys = [None] * len(chunks)
+        decoded = [None] * len(chunks)
+        if cache:
+            keys = [cache.key(audio, model_name, options) for audio in audios]
+            for i, key in enumerate(keys):
+                cached = cache.get(key)
+                if cached is not None:
+                    decoded[i] = (cached["segments"], [WordTiming(*word) for word in cached["words"]])
+                    log_message(f"Cache hit for {chunks[i].source} chunk {chunks[i].chunk_id}", self.session_id)
+        
+        missing = [i for i in range(len(chunks)) if decoded[i] is None]
+        if len(missing) == 1:
+            results = [self._transcribe_chunk(chunks[missing[0]], audios[missing[0]], active_model, options)]
+        elif missing:
+            results = self._transcribe_batch([chunks[i] for i in missing], [audios[i] for i in missing],
+                                             active_model, options)
+        else:
+            results = []
+        
+        for i, result in zip(missing, results):
+            decoded[i] = result
+            if cache:
+                segment_texts, words = result
+                cache.put(keys[i], {"segments": segment_texts, "words": [list(word) for word in words]})
+        
+        return [(audio, segment_texts, words) for audio, (segment_texts, words) in zip(audios, decoded)]
+    
+    def _transcribe_chunk(self, chunk, audio, active_model, options):
+        """Run Whisper on one chunk's 16 kHz audio. Returns (segment texts, words)."""
+        log_message(f"Transcribing {chunk.source} chunk {chunk.chunk_id}", self.session_id)
+        
+        # Transcribe the chunk
+        segments, info = active_model.transcribe(audio, **options)
+        
+        # Extract text (segments are generated lazily, so decoding happens here)
+        segment_texts = []
+        words = []
+        logprobs = []
+        for segment in segments:
+            if not is_speech(segment):
+                continue
+            segment_texts.append(segment.text.strip())
+            words.extend(WordTiming(w.word, w.start, w.end, w.probability) for w in segment.words or [])
+            logprobs.append(segment.avg_logprob)
+        
+        self._observe_language(info, logprobs, options)
+        return segment_texts, words
+    
+    def _transcribe_batch(self, chunks, audios, active_model, options):
+        """Decode several chunks in one batched Whisper call, one (segment texts, words) per chunk.
+        
+        Each chunk is padded to a whole Whisper window and given to the pipeline
+        as a window-long clip (in seconds, as faster-whisper >= 1.2 reads them),
+        so it is decoded as its own batch item: the pipeline merges neighbouring
+        clips only while they fit in one window, and would otherwise decode
+        several short chunks (possibly from different sources) as one stretch
+        of audio with one segment.
+        """
+        pipeline = get_batched_pipeline(active_model)
+        if pipeline is None or any(len(audio) > BATCH_WINDOW_SAMPLES for audio in audios):
+            return [self._transcribe_chunk(chunk, audio, active_model, options)
+                    for chunk, audio in zip(chunks, audios)]
+        
+        log_message(f"Transcribing batch of {len(chunks)} chunks: "
+                    f"{', '.join(chunk.chunk_id for chunk in chunks)}", self.session_id)
+        
+        # One window per chunk, its audio at the start and silence after
+        windows = np.zeros(BATCH_WINDOW_SAMPLES * len(audios), dtype=np.float32)
+        for i, audio in enumerate(audios):
+            windows[i * BATCH_WINDOW_SAMPLES:i * BATCH_WINDOW_SAMPLES + len(audio)] = audio
+        clips = [{"start": i * BATCH_WINDOW, "end": (i + 1) * BATCH_WINDOW} for i in range(len(audios))]
+        
+        segments, info = pipeline.transcribe(
+            windows,
+            clip_timestamps=clips,
+            chunk_length=BATCH_WINDOW,
+            batch_size=len(chunks),
+            **options
+        )
+        
+        # Hand each segment back to the chunk whose window it came from, with chunk-relative word times
+        results = [([], []) for audio in audios]
+        logprobs = [[] for audio in audios]
+        for segment in segments:
+            if not is_speech(segment):
+                continue
+            index = min(max(int(segment.start // BATCH_WINDOW), 0), len(chunks) - 1)
+            offset = index * BATCH_WINDOW
+            segment_texts, words = results[index]
+            segment_texts.append(segment.text.strip())
+            words.extend(
+                WordTiming(w.word, w.start - offset, w.end - offset, w.probability)
+                for w in segment.words or []
+            )
+            logprobs[index].append(segment.avg_logprob)
+        
+        # One detection covered the whole batch, so it counts once, with the mean over its speech chunks
+        chunk_means = [sum(chunk_logprobs) / len(chunk_logprobs) for chunk_logprobs in logprobs if chunk_logprobs]
+        self._observe_language(info, chunk_means, options)
+        return results
+    
+    def _observe_language(self, info, logprobs, options):
+        """Report a decode's language and confidence (mean of the given logprobs) to the language tracker"""
+        avg_logprob = sum(logprobs) / len(logprobs) if logprobs else None
+        self.language_tracker.observe(info.language, info.language_probability, avg_logprob,
+                                      "language" in options)
+    
+    def decode_partial(self, audio):
+        """Quick greedy decode of a chunk that is still being recorded.
+        
+        Returns the hypothesis as (word, normalized word) pairs.
+        """
+        active_model, options = self._select_model()
+        options = dict(options, beam_size=1, word_timestamps=False,
+                       without_timestamps=True, condition_on_previous_text=False)
+        segments, info = active_model.transcribe(audio, **options)
+        
+        words = []
+        for segment in segments:
+            words.extend((word, _normalize_word(word)) for word in segment.text.split())
+        return words
+    
+    def _deliver_in_order(self, chunk, result):
+        """Commit each source's results in capture order, whichever worker finishes first."""
+        source = chunk.source
+        with self.delivery_lock:
+            self.pending_results[(source, chunk.sequence)] = (chunk, result)
+            
+            while (source, self.next_sequence[source]) in self.pending_results:
+                ready_chunk, ready_result = self.pending_results.pop((source, self.next_sequence[source]))
+                self.next_sequence[source] += 1
+                if ready_result is None:
+                    continue
                 
-                # Delete the temporary file
-                os.remove(chunk_file)
-                
-            except Exception as e:
-                log_message(f"Error in transcription: {str(e)}", self.session_id)
-                if not self.transcription_queue.empty():
-                    self.transcription_queue.task_done()
+                try:
+                    self._commit_result(ready_chunk, *ready_result)
+                except Exception as e:
+                    log_message(f"Error storing transcription: {str(e)}", self.session_id)
+    
+    def _commit_result(self, chunk, audio, segment_texts, words):
+        """Stitch, diarize and publish one transcribed chunk, and hand it to the result writer.
+        
+        Called in capture order.
+        """
+        chunk_id = chunk.chunk_id
+        source = chunk.source
+        chunk.timings["delivered"] = time.monotonic()
+        
+        # Create a globally unique chunk ID
+        unique_chunk_id = f"{self.session_id}_{chunk_id}"
+        
+        # Chunks sharing audio with a neighbour are rebuilt from their own words
+        if chunk.overlap_before or chunk.overlap_after:
+            words = self._stitch_overlap(chunk, words) if words else []
+            text = "".join(w.word for w in words).strip()
+            segment_texts = [text] if text else []
+        
+        # Committed text replaces the live caption for this audio
+        if self.partial_transcriber:
+            self.partial_transcriber.commit(source, chunk.stream_offset + chunk.duration)
+        
+        # Fast path for chunks without speech: no audio copy, no DB row, just a count
+        if not segment_texts:
+            self.silent_chunks += 1
+            self.pipeline_metrics.record_chunk(chunk)
+            return
+        
+        transcription_text = " ".join(segment_texts)
+        timestamp = time.strftime("%H:%M:%S")
+        
+        # Queue the audio for its one and only write, if retention is on
+        permanent_audio_path = None
+        if self.audio_archiver:
+            permanent_audio_path = self.audio_archiver.save(chunk_id, *chunk.archive_data())
+        
+        # Identify the speaker for this chunk if it's from speaker source
+        speaker_id = None
+        if source == "speaker":
+            speaker_id = self.speaker_diarizer.identify_speaker(audio, source, ASR_SAMPLE_RATE)
+            if speaker_id:
+                log_message(f"Identified {speaker_id} for chunk {chunk_id}", self.session_id)
+        chunk.timings["diarized"] = time.monotonic()
+        
+        # Create a display name for the speaker
+        display_speaker = "You" if source == "mic" else (speaker_id if speaker_id else "Speaker")
+        
+        # Create chunk info for storage
+        chunk_info = {
+            "text": transcription_text,
+            "timestamp": timestamp,
+            "chunk_id": unique_chunk_id,
+            "audio_path": permanent_audio_path,
+            "source": source,
+            "speaker_id": speaker_id,
+            "display_speaker": display_speaker
+        }
+        
+        # Add to appropriate chunk lists
+        self.all_chunks.append(chunk_info)
+        
+        if source == "mic":
+            self.mic_chunks.append(chunk_info)
+        elif source == "speaker":
+            self.speaker_chunks.append(chunk_info)
+        
+        # Add to combined transcript list
+        self.combined_transcript.append((timestamp, display_speaker, transcription_text))
+        
+        # The database rows (with word timings, so the transcript can be seeked into the
+        # audio later) and the transcript line are written behind, in batches
+        word_rows = [(unique_chunk_id, i, w.word.strip(), w.start, w.end, w.probability, char_start, char_end)
+                     for i, (w, (char_start, char_end)) in enumerate(zip(words, word_offsets(transcription_text, words)))]
+        self.result_writer.save(
+            chunk,
+            (unique_chunk_id, self.session_id, timestamp, transcription_text, permanent_audio_path, source, speaker_id),
+            word_rows,
+            f"[{timestamp}] {display_speaker}: {transcription_text}"
+        )
+        
+        log_message(f"Transcribed {source} {display_speaker}: {transcription_text}", self.session_id)
+
+    def _stitch_overlap(self, chunk, words):
+        """Return only the words this chunk owns at its overlapping boundaries.
+        
+        Each shared margin is split at its midpoint: a word belongs to the chunk
+        holding its centre. A boundary word whose timing straddles the midpoint
+        can still be heard by both chunks, so a repeat of the previous chunk's
+        last word at the same stream time is dropped.
+        """
+        start_cut = chunk.overlap_before / 2.0
+        end_cut = chunk.duration - chunk.overlap_after / 2.0
+        kept = [w for w in words if start_cut <= (w.start + w.end) / 2.0 < end_cut]
+        
+        previous = self.boundary_words.get(chunk.source)
+        if chunk.overlap_before and previous and kept:
+            previous_text, previous_start = previous
+            first = kept[0]
+            if (_normalize_word(first.word) == previous_text
+                    and abs(chunk.stream_offset + first.start - previous_start) < 0.5):
+                kept = kept[1:]
+        
+        # Remember our last word for the chunk that continues from this one
+        if chunk.overlap_after and kept:
+            last = kept[-1]
+            self.boundary_words[chunk.source] = (_normalize_word(last.word), chunk.stream_offset + last.start)
+        else:
+            self.boundary_words.pop(chunk.source, None)
+        
+        return kept
 
     def stop(self):
         """Stop the recording session"""
         log_message("Stopping recording session", self.session_id)
         self.is_recording = False
         self.recorder.stop()
+        if self.partial_transcriber:
+            self.partial_transcriber.join()
+        
+        # Results still being written belong above the closing summary
+        self.result_writer.flush()
         
         # Update session status in database
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
@@ -245,15 +669,17 @@ class TranscriptionSession:
         log_message(f"Transcript finalized: {self.combined_transcript_file}", self.session_id)
         
     def cleanup(self):
-        """Clean up temp files"""
+        """Wait for pending chunks and flush stored results and retained audio"""
         log_message("Cleaning up session", self.session_id)
         self.is_recording = False
         # Wait for queue to be processed
         self.transcription_queue.join()
-        # Delete temp directory (but keep transcript files)
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
-        log_message(f"Removed temporary files directory: {self.temp_dir}", self.session_id)
+        # Store the last results
+        self.result_writer.close()
+        # Finish writing any retained audio
+        if self.audio_archiver:
+            self.audio_archiver.close()
+            log_message("Retained audio flushed to audio_chunks/", self.session_id)
         
     def get_new_chunks(self, last_chunk_id=None):
         """Get all new chunks since last_chunk_id, from both sources."""
@@ -274,6 +700,23 @@ class TranscriptionSession:
         # If not found, return all chunks
         return all_chunks
     
+    def discard_partial(self, source, stream_end):
+        """Drop the live captions for audio of `source` up to stream_end that will never be committed
+        (skipped as cross-talk, too little speech, or dropped by the queue).
+        """
+        if self.partial_transcriber:
+            self.partial_transcriber.commit(source, stream_end)
+    
+    def is_decoding(self):
+        """Whether the shared workers are decoding a batch for any session."""
+        return scheduler is not None and scheduler.busy()
+    
+    def get_partials(self):
+        """Live captions for speech not yet committed, oldest first."""
+        if self.partial_transcriber is None:
+            return []
+        return self.partial_transcriber.get_partials()
+    
     def get_combined_transcript(self):
         """Get the complete transcript as a string."""
         return "\n".join([f"[{ts}] {speaker}: {text}" for ts, speaker, text in 
@@ -285,55 +728,111 @@ class TranscriptionSession:
 
 # Global functions for API access
 
-def start_session():
-    """Start a new transcription session"""
-    global active_session
-    
-    # Stop any existing session
-    if active_session:
-        stop_session()
-    
-    # Create a new session
-    active_session = TranscriptionSession()
-    return active_session.session_id
+def get_scheduler():
+    """Start the shared transcription workers on first use"""
+    global scheduler
+    if scheduler is None:
+        scheduler = ASRScheduler(TRANSCRIPTION_WORKERS)
+    return scheduler
+
+def get_session(session_id=None):
+    """Get a running session by ID, or the most recently started one"""
+    with sessions_lock:
+        if session_id:
+            return sessions.get(session_id)
+        return next(reversed(sessions.values()), None)
 
-def stop_session():
-    """Stop the active transcription session"""
-    global active_session
+def start_session(sources=None, weight=DEFAULT_SESSION_WEIGHT, max_concurrency=SESSION_MAX_CONCURRENCY):
+    """Start a new transcription session alongside any that are already running"""
+    with sessions_lock:
+        # The first session keeps the fixed transcript file; concurrent ones get their own.
+        # The file is claimed before the (slow) session setup, so two sessions starting
+        # at once never share it
+        session_id = str(os.urandom(16).hex())
+        transcript_file = FIXED_TRANSCRIPT_FILE
+        if transcript_file in claimed_transcript_files:
+            transcript_file = f"transcriptions/transcription_{session_id[:8]}.txt"
+        claimed_transcript_files.add(transcript_file)
     
-    if active_session:
-        active_session.stop()
-        active_session.cleanup()
-        session_id = active_session.session_id
-        active_session = None
-        return session_id
+    try:
+        session = TranscriptionSession(session_id, sources, weight, max_concurrency, transcript_file)
+    except Exception:
+        with sessions_lock:
+            claimed_transcript_files.discard(transcript_file)
+        raise
+    with sessions_lock:
+        sessions[session_id] = session
+    get_scheduler().register(session)
+    return session_id
+
+def stop_session(session_id=None):
+    """Stop a session (the most recently started one by default)"""
+    session = get_session(session_id)
+    if session is None:
+        return None
     
-    return None
+    session.stop()
+    session.cleanup()
+    scheduler.unregister(session)
+    with sessions_lock:
+        sessions.pop(session.session_id, None)
+        claimed_transcript_files.discard(session.combined_transcript_file)
+    return session.session_id
 
-def get_session_status():
-    """Get the status of the active session"""
-    global active_session
+def get_session_status(session_id=None):
+    """Get the status of a session (the most recently started one by default)"""
+    session = get_session(session_id)
+    with sessions_lock:
+        running = list(sessions)
     
-    if active_session:
+    if session:
         return {
             "active": True,
-            "session_id": active_session.session_id
+            "session_id": session.session_id,
+            "sessions": running,
+            "queue": session.transcription_queue.get_metrics(),
+            "quality": session.quality_ladder.get_state(),
+            "cache": transcription_cache.get_metrics() if transcription_cache else None,
+            "language": session.language_tracker.get_state(),
+            "silent_chunks": session.silent_chunks,
+            "scheduler": scheduler.get_state() if scheduler else None
         }
     else:
         return {
             "active": False,
-            "session_id": None
+            "session_id": None,
+            "sessions": running
         }
 
-def get_latest_chunks(last_chunk_id=None):
+def get_latest_chunks(last_chunk_id=None, session_id=None):
     """Get the latest transcription chunks"""
-    global active_session
+    session = get_session(session_id)
     
-    if active_session:
-        return active_session.get_new_chunks(last_chunk_id)
+    if session:
+        return session.get_new_chunks(last_chunk_id)
     else:
-        # If no active session, check database for most recent session
-        session_id = get_latest_session_id()
+        # If no running session, check database for the requested or most recent session
+        session_id = session_id or get_latest_session_id()
         if session_id:
             return get_chunks_from_db(session_id, last_chunk_id)
-        return []
\ No newline at end of file
+        return []
+
+def get_latest_partials(session_id=None):
+    """Get live captions for a running session"""
+    session = get_session(session_id)
+    
+    if session:
+        return session.get_partials()
+    return []
+
+def get_pipeline_metrics(session_id=None):
+    """Per-stage latency percentiles and real-time factor of a running session"""
+    session = get_session(session_id)
+    
+    if session:
+        return {
+            "active": True,
+            "session_id": session.session_id,
+            "pipeline": session.pipeline_metrics.get_metrics()
+        }
+    return {"active": False, "session_id": None}
\ No newline at end of file
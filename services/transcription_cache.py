@@ -0,0 +1,175 @@
+import atexit
+import collections
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+import numpy as np
+from utils.audio_utils import log_message
+
+class TranscriptionCache:
+    """
+    Persistent transcription results keyed by audio content.
+
+    The key is a SHA-256 of the float32 PCM together with the model and
+    decode options, so identical audio decoded the same way is only ever
+    transcribed once, across sessions and restarts. Entries live in their own
+    SQLite file; once they take up more than max_bytes the least recently
+    used ones are evicted.
+
+    The LRU order and sizes are kept in memory, so a lookup is one read on a
+    long-lived connection and never writes. New entries, evictions and the
+    last_used times of hits are written behind by a background thread, which
+    commits whatever has queued up in one transaction.
+    """
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "evictions": 0}
+
+        # key -> size, least recently used first
+        self.index = collections.OrderedDict()
+        # key -> serialized value queued for writing but not stored yet
+        self.pending = {}
+
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        cursor = self.conn.cursor()
+        # Readers on the ASR workers don't wait for the writer's commits
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transcription_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            size INTEGER,
+            last_used REAL
+        )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_used ON transcription_cache (last_used)")
+        self.conn.commit()
+
+        cursor.execute("SELECT key, size FROM transcription_cache ORDER BY last_used")
+        for key, size in cursor.fetchall():
+            self.index[key] = size
+        self.entries = len(self.index)
+        self.total_bytes = sum(self.index.values())
+
+        self.write_queue = queue.Queue()
+        self.writer_thread = threading.Thread(target=self._write_entries, name="cache-writer")
+        self.writer_thread.daemon = True
+        self.writer_thread.start()
+        atexit.register(self.close)
+
+        log_message(f"Transcription cache: {self.entries} entries, {self.total_bytes / 1e6:.1f} MB")
+
+    @staticmethod
+    def key(audio, model_name, options):
+        """Cache key for decoding `audio` with the named model and decode options."""
+        digest = hashlib.sha256(np.ascontiguousarray(audio, dtype=np.float32).tobytes())
+        digest.update(json.dumps({"model": model_name, "options": options}, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Cached value for key, or None. A hit makes the entry most recently used."""
+        with self.lock:
+            if key not in self.index:
+                self.metrics["misses"] += 1
+                return None
+
+            data = self.pending.get(key)
+            if data is None:
+                row = self.conn.execute("SELECT value FROM transcription_cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.metrics["misses"] += 1
+                    return None
+                data = row[0]
+
+            self.index.move_to_end(key)
+            self.metrics["hits"] += 1
+        self.write_queue.put(("touch", key, time.time()))
+        return json.loads(data)
+
+    def put(self, key, value):
+        """Store a JSON-serializable value, evicting old entries past the size limit."""
+        data = json.dumps(value)
+        size = len(data)
+
+        with self.lock:
+            if key in self.index:
+                self.entries -= 1
+                self.total_bytes -= self.index.pop(key)
+            self.index[key] = size
+            self.pending[key] = data
+            self.entries += 1
+            self.total_bytes += size
+            self.write_queue.put(("put", key, data, size, time.time()))
+
+            # Evict least recently used entries until we are back under the limit
+            while self.total_bytes > self.max_bytes and self.entries > 1:
+                old_key, old_size = self.index.popitem(last=False)
+                self.pending.pop(old_key, None)
+                self.entries -= 1
+                self.total_bytes -= old_size
+                self.metrics["evictions"] += 1
+                self.write_queue.put(("delete", old_key))
+
+    def _write_entries(self):
+        """Apply queued writes, everything that has piled up in one transaction, until closed."""
+        conn = sqlite3.connect(self.path)
+        closed = False
+        while not closed:
+            batch = [self.write_queue.get()]
+            while True:
+                try:
+                    batch.append(self.write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            closed = None in batch
+            operations = [operation for operation in batch if operation is not None]
+
+            try:
+                with conn:
+                    for operation in operations:
+                        if operation[0] == "put":
+                            conn.execute(
+                                "INSERT OR REPLACE INTO transcription_cache (key, value, size, last_used) "
+                                "VALUES (?, ?, ?, ?)",
+                                operation[1:]
+                            )
+                        elif operation[0] == "touch":
+                            conn.execute("UPDATE transcription_cache SET last_used = ? WHERE key = ?",
+                                         (operation[2], operation[1]))
+                        else:
+                            conn.execute("DELETE FROM transcription_cache WHERE key = ?", (operation[1],))
+
+                # Stored entries are read back from the database from now on
+                with self.lock:
+                    for operation in operations:
+                        if operation[0] == "put" and self.pending.get(operation[1]) is operation[2]:
+                            del self.pending[operation[1]]
+            except Exception as e:
+                log_message(f"Error writing {len(operations)} transcription cache updates: {str(e)}")
+            finally:
+                for _ in batch:
+                    self.write_queue.task_done()
+        conn.close()
+
+    def flush(self):
+        """Block until every queued write is stored."""
+        self.write_queue.join()
+
+    def close(self):
+        """Store pending writes and stop the writer thread."""
+        if self.writer_thread.is_alive():
+            self.write_queue.put(None)
+            self.writer_thread.join()
+
+    def get_metrics(self):
+        """Hit/miss counters and current size."""
+        with self.lock:
+            metrics = dict(self.metrics)
+            metrics.update({"entries": self.entries, "bytes": self.total_bytes, "max_bytes": self.max_bytes,
+                            "pending_writes": self.write_queue.qsize()})
+            return metrics
@@ -0,0 +1,184 @@
+import collections
+import numpy as np
+from config import (VAD_FRAME_DURATION, VAD_SPEECH_RATIO, VAD_PAUSE_DURATION,
+                    VAD_PADDING_DURATION, VAD_MIN_SPEECH_DURATION,
+                    MIN_CHUNK_DURATION, MAX_CHUNK_DURATION)
+
+class StreamingVAD:
+    """
+    Frame-level voice activity detector for a continuous mono stream.
+
+    A frame is speech when its mean absolute level is above both the fixed
+    noise threshold and the adaptive noise floor times VAD_SPEECH_RATIO.
+    The noise floor follows non-speech frames quickly and speech frames
+    very slowly, so steady background noise stops registering as speech.
+    """
+    def __init__(self, sample_rate, threshold):
+        self.frame_size = int(VAD_FRAME_DURATION * sample_rate)
+        self.threshold = threshold
+        self.noise_floor = None
+
+    def classify(self, frames):
+        """Return (speech flags, frame levels) for a 2-D array of frames."""
+        levels = np.abs(frames).mean(axis=1)
+        flags = np.zeros(len(levels), dtype=bool)
+
+        for i, level in enumerate(levels):
+            if self.noise_floor is None:
+                self.noise_floor = level
+
+            flags[i] = level >= self.threshold and level >= self.noise_floor * VAD_SPEECH_RATIO
+
+            if level < self.noise_floor:
+                self.noise_floor = level
+            elif flags[i]:
+                self.noise_floor = 0.999 * self.noise_floor + 0.001 * level
+            else:
+                self.noise_floor = 0.9 * self.noise_floor + 0.1 * level
+
+        return flags, levels
+
+class SpeechSegmenter:
+    """
+    Cuts a continuous stream into variable-length speech chunks.
+
+    A chunk ends at the first pause of VAD_PAUSE_DURATION once it is at
+    least MIN_CHUNK_DURATION long, or at its quietest frame when it reaches
+    MAX_CHUNK_DURATION. Chunks keep VAD_PADDING_DURATION of audio around the
+    speech, and spans without enough speech are never emitted. Each chunk is
+    flagged as continued when it was cut mid-speech and the next chunk picks
+    up exactly where it ends.
+    """
+    def __init__(self, sample_rate, threshold):
+        self.vad = StreamingVAD(sample_rate, threshold)
+        self.frame_size = self.vad.frame_size
+
+        frame_duration = self.frame_size / float(sample_rate)
+        self.min_frames = int(MIN_CHUNK_DURATION / frame_duration)
+        self.max_frames = int(MAX_CHUNK_DURATION / frame_duration)
+        self.pause_frames = max(1, int(VAD_PAUSE_DURATION / frame_duration))
+        self.padding_frames = int(VAD_PADDING_DURATION / frame_duration)
+        self.min_speech_frames = max(1, int(VAD_MIN_SPEECH_DURATION / frame_duration))
+
+        # Samples left over from the last call that don't fill a frame
+        self.pending = np.zeros(0, dtype=np.float32)
+        # Stream position (in samples) of the next frame
+        self.position = 0
+        # End of the last span that was dropped for holding too little speech
+        self.discarded_until = 0
+
+        # Current chunk: its frames, their speech flags and levels
+        self.frames = []
+        self.flags = []
+        self.levels = []
+        self.segment_start = None
+        self.silence_run = 0
+
+        # Recent non-speech frames, used as lead-in padding for the next chunk
+        self.preroll = collections.deque(maxlen=self.padding_frames)
+
+    def feed(self, samples):
+        """Add samples to the stream; return completed (audio, start_position, continued) chunks."""
+        data = np.concatenate((self.pending, np.asarray(samples, dtype=np.float32)))
+        num_frames = len(data) // self.frame_size
+        frames = data[:num_frames * self.frame_size].reshape(num_frames, self.frame_size)
+        self.pending = data[num_frames * self.frame_size:]
+
+        flags, levels = self.vad.classify(frames)
+        completed = []
+
+        for frame, speech, level in zip(frames, flags, levels):
+            position = self.position
+            self.position += self.frame_size
+
+            if self.segment_start is None:
+                if not speech:
+                    self.preroll.append(frame)
+                    continue
+
+                # Speech starts a new chunk, led in by the buffered padding
+                self.segment_start = position - len(self.preroll) * self.frame_size
+                self.frames = list(self.preroll)
+                self.flags = [False] * len(self.preroll)
+                self.levels = [0.0] * len(self.preroll)
+                self.preroll.clear()
+                self.silence_run = 0
+
+            self.frames.append(frame)
+            self.flags.append(bool(speech))
+            self.levels.append(level)
+            self.silence_run = 0 if speech else self.silence_run + 1
+
+            # Short chunks hold on to a pause for a while in case speech resumes
+            if self.silence_run >= self.pause_frames and (
+                    len(self.frames) >= self.min_frames or self.silence_run >= self.min_frames):
+                completed.extend(self._finish_at_pause())
+            elif len(self.frames) >= self.max_frames:
+                completed.extend(self._split_at_quietest())
+
+        return completed
+
+    def flush(self):
+        """End the stream, returning the open chunk if it holds enough speech."""
+        if self.segment_start is None:
+            return []
+        return self._finish_at_pause()
+
+    def resync(self, position):
+        """Continue the stream at `position` after a gap in the input (e.g. lost audio).
+
+        The open chunk ends where the audio before the gap ends; it is returned
+        if it holds enough speech, like flush().
+        """
+        completed = self.flush()
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.preroll.clear()
+        self.position = position
+        return completed
+
+    def open_segment(self):
+        """Return (audio, start_position) of the chunk still being collected, or None."""
+        if self.segment_start is None or not self.frames:
+            return None
+        return np.concatenate(self.frames), self.segment_start
+
+    def _finish_at_pause(self):
+        """End the current chunk after its last speech frame plus padding."""
+        keep = len(self.frames) - self.silence_run + min(self.padding_frames, self.silence_run)
+        completed = self._emit(keep, continued=False)
+
+        # Trailing silence becomes lead-in padding for the next chunk
+        self.preroll.extend(self.frames)
+        self.frames, self.flags, self.levels = [], [], []
+        self.segment_start = None
+        self.silence_run = 0
+        return completed
+
+    def _split_at_quietest(self):
+        """Cut an over-long chunk at its quietest frame in the second half."""
+        half = len(self.frames) // 2
+        split = half + int(np.argmin(self.levels[half:]))
+        if split == 0:
+            split = len(self.frames)
+
+        continued = any(self.flags[split:])
+        completed = self._emit(split, continued)
+        self.segment_start += split * self.frame_size
+        self.frames = self.frames[split:]
+        self.flags = self.flags[split:]
+        self.levels = self.levels[split:]
+        self.silence_run = 0
+
+        if not self.frames or not any(self.flags):
+            self.discarded_until = self.segment_start + len(self.frames) * self.frame_size
+            self.preroll.extend(self.frames)
+            self.frames, self.flags, self.levels = [], [], []
+            self.segment_start = None
+        return completed
+
+    def _emit(self, num_frames, continued):
+        """Return the first num_frames frames as a chunk if they hold enough speech."""
+        if sum(self.flags[:num_frames]) < self.min_speech_frames:
+            self.discarded_until = self.segment_start + num_frames * self.frame_size
+            return []
+        return [(np.concatenate(self.frames[:num_frames]), self.segment_start, continued)]
@@ -56,7 +56,7 @@ document.addEventListener('DOMContentLoaded', () => {
     speakerThresholdSlider.addEventListener('input', updateSpeakerThreshold);
     
     // Check initial status
-    checkStatus();
+    checkStatus().then(checkReady);
 });
 
 // Assign a consistent color to each speaker
@@ -228,6 +228,8 @@ const fetchChunks = async () => {
             // Update last chunk ID for next poll
             lastChunkId = data.chunks[data.chunks.length - 1].chunk_id;
         }
+        
+        renderPartials(data.partials || []);
     } catch (error) {
         console.error('Error fetching chunks:', error);
     }
@@ -306,6 +308,49 @@ const appendChunks = (chunks) => {
     chunksContainer.scrollTop = chunksContainer.scrollHeight;
 };
 
+// Live captions: replaced on every poll, always shown after the committed chunks
+const renderPartials = (partials) => {
+    chunksContainer.querySelectorAll('.transcription-chunk.partial').forEach(element => element.remove());
+    
+    partials.forEach(partial => {
+        const partialElement = document.createElement('div');
+        partialElement.className = `transcription-chunk partial ${partial.source || 'unknown'}`;
+        
+        const contentDiv = document.createElement('div');
+        contentDiv.className = 'chunk-content';
+        
+        const timestampElement = document.createElement('div');
+        timestampElement.className = 'chunk-timestamp';
+        timestampElement.textContent = partial.timestamp;
+        
+        const sourceBadge = document.createElement('span');
+        sourceBadge.className = `source-badge ${partial.source || 'unknown'}`;
+        sourceBadge.textContent = partial.display_speaker;
+        
+        // Stable words won't change any more; the unstable tail may still be revised
+        const textElement = document.createElement('div');
+        textElement.className = 'chunk-text';
+        const stableText = document.createElement('span');
+        stableText.textContent = partial.stable;
+        const unstableText = document.createElement('span');
+        unstableText.className = 'unstable';
+        unstableText.textContent = partial.stable ? ` ${partial.unstable}` : partial.unstable;
+        textElement.appendChild(stableText);
+        textElement.appendChild(unstableText);
+        
+        contentDiv.appendChild(timestampElement);
+        contentDiv.appendChild(sourceBadge);
+        contentDiv.appendChild(textElement);
+        partialElement.appendChild(contentDiv);
+        
+        chunksContainer.appendChild(partialElement);
+    });
+    
+    if (partials.length > 0) {
+        chunksContainer.scrollTop = chunksContainer.scrollHeight;
+    }
+};
+
 // Update the legend with all speaker colors
 const updateSpeakerLegend = () => {
     const legendElement = document.querySelector('.legend');
@@ -380,8 +425,8 @@ const startPolling = () => {
     // Clear any existing interval
     stopPolling();
     
-    // Start polling for new chunks every second
-    pollingInterval = setInterval(fetchChunks, 1000);
+    // Poll twice a second so live captions keep up with speech
+    pollingInterval = setInterval(fetchChunks, 500);
 };
 
 const stopPolling = () => {
@@ -391,6 +436,28 @@ const stopPolling = () => {
     }
 };
 
+// Poll until the transcription models are loaded, so the user knows starting will be instant
+const checkReady = async () => {
+    try {
+        const response = await fetch('/api/ready');
+        const data = await response.json();
+        
+        if (data.ready || isRecording) {
+            if (!isRecording) {
+                statusText.textContent = 'Inactive';
+            }
+            return;
+        }
+        
+        statusText.textContent = data.error ? `Model failed to load: ${data.error}` : 'Loading model...';
+        if (!data.error) {
+            setTimeout(checkReady, 2000);
+        }
+    } catch (error) {
+        console.error('Error checking model readiness:', error);
+    }
+};
+
 const checkStatus = async () => {
     try {
         const response = await fetch('/api/status');
@@ -0,0 +1,68 @@
+import types
+import pytest
+
+pytest.importorskip("faster_whisper")
+
+import numpy as np
+from config import ASR_SAMPLE_RATE
+from services import transcription
+from services.transcription import TranscriptionSession
+
+# Audio level -> word the fake pipeline "hears" in a clip
+WORDS = {1: "hello", 2: "world"}
+
+class MergingPipeline:
+    """
+    Stands in for faster-whisper (>= 1.2) BatchedInferencePipeline: clip_timestamps
+    are read in seconds, and like collect_chunks it joins neighbouring clips while
+    their total length fits in chunk_length, then decodes each group as one
+    segment starting at the group's first clip.
+    """
+    def transcribe(self, audio, clip_timestamps, chunk_length=30, batch_size=1, **options):
+        clip_timestamps = [{key: int(value * ASR_SAMPLE_RATE) for key, value in clip.items()}
+                           for clip in clip_timestamps]
+        groups, current = [], []
+        for clip in clip_timestamps:
+            length = sum(c["end"] - c["start"] for c in current)
+            if current and length + clip["end"] - clip["start"] > chunk_length * ASR_SAMPLE_RATE:
+                groups.append(current)
+                current = []
+            current.append(clip)
+        groups.append(current)
+
+        segments = []
+        for group in groups:
+            texts = []
+            for clip in group:
+                level = int(round(np.abs(audio[clip["start"]:clip["end"]]).max() * 10))
+                if level in WORDS:
+                    texts.append(WORDS[level])
+            start = group[0]["start"] / ASR_SAMPLE_RATE
+            words = [types.SimpleNamespace(word=" " + text, start=start + 0.1, end=start + 0.5, probability=0.9)
+                     for text in texts]
+            segments.append(types.SimpleNamespace(text=" " + " ".join(texts), start=start, end=start + 1,
+                                                  no_speech_prob=0.0, avg_logprob=-0.2, words=words))
+        info = types.SimpleNamespace(language="en", language_probability=0.99)
+        return iter(segments), info
+
+def test_batch_splits_text_back_to_each_source():
+    session = object.__new__(TranscriptionSession)
+    session.session_id = "test"
+    session.language_tracker = types.SimpleNamespace(observe=lambda *args: None)
+
+    whisper_model = object()
+    transcription.batched_pipelines[id(whisper_model)] = MergingPipeline()
+    try:
+        chunks = [types.SimpleNamespace(source="mic", chunk_id="mic_0"),
+                  types.SimpleNamespace(source="speaker", chunk_id="speaker_0")]
+        audios = [np.full(2 * ASR_SAMPLE_RATE, 0.1, dtype=np.float32),
+                  np.full(3 * ASR_SAMPLE_RATE, 0.2, dtype=np.float32)]
+        results = session._transcribe_batch(chunks, audios, whisper_model, {})
+    finally:
+        transcription.batched_pipelines.pop(id(whisper_model), None)
+
+    (mic_texts, mic_words), (speaker_texts, speaker_words) = results
+    assert mic_texts == ["hello"]
+    assert speaker_texts == ["world"]
+    # Word times are relative to each chunk's own audio
+    assert [(w.start, w.end) for w in speaker_words] == [pytest.approx((0.1, 0.5))]
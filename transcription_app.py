@@ -1,11 +1,18 @@
 from flask import Flask, render_template, jsonify, request, send_file, abort
 import os
-from services.transcription import start_session, stop_session, get_session_status, get_latest_chunks, active_session
+import math
+from services.transcription import (start_session, stop_session, get_session, get_session_status, get_latest_chunks,
+                                    get_latest_partials, get_model_status, preload_models, get_pipeline_metrics)
 from utils.audio_utils import log_message, get_available_devices
-from database.db_utils import get_audio_path
+from database.db_utils import get_audio_path, get_chunk_words, audio_offset_for_position, position_for_audio_offset
 
 app = Flask(__name__)
 
+def requested_session_id():
+    """Session named by the request (query string or JSON body), or None for the latest one"""
+    data = request.get_json(silent=True) or {}
+    return request.args.get('session_id') or data.get('session_id')
+
 # Serve static audio files from audio_chunks directory
 @app.route('/audio_chunks/<path:filename>')
 def serve_audio(filename):
@@ -20,8 +27,9 @@ def process_to_main():
     """Process current transcript and redirect to main app for further processing."""
     try:
         # Get the current transcript info
-        if active_session:
-            transcript_path = active_session.get_transcript_file_path()
+        session = get_session(requested_session_id())
+        if session:
+            transcript_path = session.get_transcript_file_path()
             
             if not transcript_path:
                 return jsonify({"success": False, "error": "No transcript file available"})
@@ -73,28 +81,52 @@ def get_devices():
 
 @app.route('/api/start', methods=['POST'])
 def api_start_session():
-    """Start a new transcription session"""
-    session_id = start_session()
+    """Start a new transcription session; other running sessions keep going"""
+    data = request.get_json(silent=True) or {}
+    options = {key: data[key] for key in ('weight', 'max_concurrency') if key in data}
+    
+    # A bad weight or limit would break the scheduler workers shared by every session
+    weight = options.get('weight', 1)
+    if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not math.isfinite(weight) or weight <= 0:
+        return jsonify({"success": False, "error": "weight must be a positive number"}), 400
+    max_concurrency = options.get('max_concurrency', 1)
+    if isinstance(max_concurrency, bool) or not isinstance(max_concurrency, int) or max_concurrency < 1:
+        return jsonify({"success": False, "error": "max_concurrency must be an integer of at least 1"}), 400
+    
+    session_id = start_session(**options)
     return jsonify({"success": True, "session_id": session_id})
 
 @app.route('/api/stop', methods=['POST'])
 def api_stop_session():
-    """Stop the active transcription session"""
-    session_id = stop_session()
+    """Stop a transcription session (the latest one unless session_id is given)"""
+    session_id = stop_session(requested_session_id())
     return jsonify({"success": True, "session_id": session_id})
 
+@app.route('/api/ready', methods=['GET'])
+def api_ready():
+    """Whether the models are loaded, i.e. starting a session will be instant"""
+    return jsonify(get_model_status())
+
 @app.route('/api/status', methods=['GET'])
 def api_get_status():
-    """Get the status of the active session"""
-    status = get_session_status()
+    """Get the status of a session (the latest one unless session_id is given)"""
+    status = get_session_status(requested_session_id())
     return jsonify(status)
 
+@app.route('/api/metrics', methods=['GET'])
+def api_get_metrics():
+    """Per-stage latency percentiles and histograms of a session (the latest one unless session_id is given)"""
+    return jsonify(get_pipeline_metrics(requested_session_id()))
+
 @app.route('/api/chunks', methods=['GET'])
 def api_get_chunks():
     """Get the latest transcription chunks"""
     last_chunk_id = request.args.get('last_chunk_id', None)
-    chunks = get_latest_chunks(last_chunk_id)
-    return jsonify({"chunks": chunks})
+    session_id = requested_session_id()
+    chunks = get_latest_chunks(last_chunk_id, session_id)
+    # Live captions for speech that has not been committed yet
+    partials = get_latest_partials(session_id)
+    return jsonify({"chunks": chunks, "partials": partials})
 
 @app.route('/api/audio/<path:chunk_id>', methods=['GET'])
 def get_audio(chunk_id):
@@ -105,10 +137,47 @@ def get_audio(chunk_id):
     else:
         abort(404)
 
+@app.route('/api/words/<path:chunk_id>', methods=['GET'])
+def get_words(chunk_id):
+    """Get the timed words of a chunk"""
+    return jsonify({"chunk_id": chunk_id, "words": get_chunk_words(chunk_id)})
+
+@app.route('/api/seek/<path:chunk_id>', methods=['GET'])
+def seek(chunk_id):
+    """Map between a chunk's text and its audio.
+    
+    ?char=N returns the audio offset of the word at character N of the chunk text;
+    ?time=T returns the text position of the word spoken T seconds into the audio.
+    """
+    try:
+        if 'char' in request.args:
+            word = audio_offset_for_position(chunk_id, int(request.args['char']))
+        elif 'time' in request.args:
+            word = position_for_audio_offset(chunk_id, float(request.args['time']))
+        else:
+            return jsonify({"success": False, "error": "Give either char or time"}), 400
+    except ValueError:
+        return jsonify({"success": False, "error": "Invalid char or time parameter"}), 400
+    
+    if word is None:
+        abort(404)
+    
+    return jsonify({
+        "success": True,
+        "chunk_id": chunk_id,
+        "audio_url": f"/api/audio/{chunk_id}",
+        "offset": word["start_time"],
+        "end": word["end_time"],
+        "word": word["word"],
+        "char_start": word["char_start"],
+        "char_end": word["char_end"]
+    })
+
 @app.route('/api/set_mic_threshold', methods=['POST'])
 def set_mic_threshold():
     """Set the microphone noise threshold for the active recording session"""
-    if not active_session:
+    session = get_session(requested_session_id())
+    if not session:
         return jsonify({"success": False, "error": "No active recording session"})
     
     data = request.json
@@ -120,7 +189,7 @@ def set_mic_threshold():
         if threshold < 0:
             return jsonify({"success": False, "error": "Threshold must be positive"})
         
-        active_session.recorder.set_mic_threshold(threshold)
+        session.recorder.set_mic_threshold(threshold)
         return jsonify({"success": True})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
@@ -128,7 +197,8 @@ def set_mic_threshold():
 @app.route('/api/set_speaker_threshold', methods=['POST'])
 def set_speaker_threshold():
     """Set the speaker noise threshold for the active recording session"""
-    if not active_session:
+    session = get_session(requested_session_id())
+    if not session:
         return jsonify({"success": False, "error": "No active recording session"})
     
     data = request.json
@@ -140,7 +210,7 @@ def set_speaker_threshold():
         if threshold < 0:
             return jsonify({"success": False, "error": "Threshold must be positive"})
         
-        active_session.recorder.set_speaker_threshold(threshold)
+        session.recorder.set_speaker_threshold(threshold)
         return jsonify({"success": True})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
@@ -150,10 +220,11 @@ def get_transcript():
     """Get the complete combined transcript"""
     fixed_transcript_path = "transcriptions/transcription.txt"
     
-    if active_session:
+    session = get_session(requested_session_id())
+    if session:
         return jsonify({
-            "transcript": active_session.get_combined_transcript(),
-            "file_path": fixed_transcript_path
+            "transcript": session.get_combined_transcript(),
+            "file_path": session.get_transcript_file_path()
         })
     else:
         # Check if the fixed transcript file exists
@@ -175,4 +246,11 @@ def get_transcript():
         })
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=3000)
\ No newline at end of file
+    debug = True
+    
+    # Load the models while the server starts. The debug reloader serves from a
+    # child process, so only load them there.
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        preload_models()
+    
+    app.run(debug=debug, host='0.0.0.0', port=3000)
\ No newline at end of file
@@ -1,4 +1,3 @@
-import soundcard as sc
 import soundfile as sf
 import numpy as np
 import datetime
@@ -42,6 +41,9 @@ def get_available_devices():
     }
     
     try:
+        # Imported here so headless hosts without an audio stack can still load this module
+        import soundcard as sc
+        
         for mic in sc.all_microphones():
             devices["microphones"].append({"name": mic.name, "id": mic.id})
         
@@ -61,6 +63,110 @@ def get_available_devices():
     
     return devices
 
+def resample_audio(audio_data, orig_rate, target_rate):
+    """Resample mono audio with a polyphase filter, returning float32 samples"""
+    if orig_rate == target_rate:
+        return np.asarray(audio_data, dtype=np.float32)
+    
+    from math import gcd
+    from scipy import signal
+    divisor = gcd(int(orig_rate), int(target_rate))
+    resampled = signal.resample_poly(audio_data, int(target_rate) // divisor, int(orig_rate) // divisor)
+    return resampled.astype(np.float32)
+
+class StreamingResampler:
+    """
+    Polyphase FIR resampler for a continuous mono stream.
+
+    Filter state is carried between calls, so resampling a stream block by
+    block gives the same samples as resampling it in one piece, with no
+    clicks at block boundaries. Uses the same Kaiser-windowed lowpass as
+    scipy.signal.resample_poly.
+    """
+    def __init__(self, orig_rate, target_rate):
+        from math import gcd
+        from scipy import signal
+        
+        divisor = gcd(int(orig_rate), int(target_rate))
+        self.up = int(target_rate) // divisor
+        self.down = int(orig_rate) // divisor
+        
+        # Nothing to filter when the rates already match
+        self.passthrough = self.up == self.down
+        if self.passthrough:
+            return
+        
+        max_rate = max(self.up, self.down)
+        half_len = 10 * max_rate
+        taps = signal.firwin(2 * half_len + 1, 1.0 / max_rate, window=('kaiser', 5.0)) * self.up
+        
+        # Split the filter into one reversed sub-filter per output phase
+        self.taps_per_phase = -(-len(taps) // self.up)
+        taps = np.pad(taps, (0, self.taps_per_phase * self.up - len(taps)))
+        self.phases = taps.reshape(self.taps_per_phase, self.up).T[:, ::-1].astype(np.float32)
+        
+        # Input history needed by the next block, and the position of the next
+        # output sample in upsampled units relative to the start of the history
+        self.history = np.zeros(self.taps_per_phase - 1, dtype=np.float32)
+        self.position = (self.taps_per_phase - 1) * self.up
+        self.offsets = np.arange(-(self.taps_per_phase - 1), 1)
+    
+    def process(self, block):
+        """Resample the next block of the stream, returning float32 samples"""
+        if self.passthrough:
+            return np.asarray(block, dtype=np.float32)
+        
+        x = np.concatenate((self.history, np.asarray(block, dtype=np.float32)))
+        total = len(x) * self.up
+        
+        if self.position >= total:
+            num_out = 0
+        else:
+            num_out = (total - self.position - 1) // self.down + 1
+        
+        # Evaluate every output sample of this block in one vectorized pass
+        positions = self.position + np.arange(num_out) * self.down
+        windows = x[positions[:, None] // self.up + self.offsets]
+        output = np.einsum('ij,ij->i', windows, self.phases[positions % self.up]).astype(np.float32)
+        
+        # Keep just enough input for the next block's filter windows
+        shift = len(x) - len(self.history)
+        self.history = x[shift:]
+        self.position += num_out * self.down - shift * self.up
+        
+        return output
+
+def max_normalized_correlation(signal_data, reference, max_lag):
+    """
+    Peak normalized cross-correlation of signal_data against reference.
+    
+    reference must be len(signal_data) + 2 * max_lag samples long, so that
+    reference[max_lag:max_lag + len(signal_data)] lines up at zero lag. Every
+    lag in [-max_lag, max_lag] is scored in one FFT pass; returns
+    (peak correlation in [0, 1], lag in samples).
+    """
+    n = len(signal_data)
+    num_lags = 2 * max_lag + 1
+    if n == 0 or len(reference) < n + 2 * max_lag:
+        return 0.0, 0
+    
+    signal_data = np.asarray(signal_data, dtype=np.float64)
+    reference = np.asarray(reference[:n + 2 * max_lag], dtype=np.float64)
+    
+    # Raw correlation at every lag via FFT
+    fft_size = 1 << int(np.ceil(np.log2(len(reference) + n)))
+    spectrum = np.fft.rfft(reference, fft_size) * np.conj(np.fft.rfft(signal_data, fft_size))
+    raw = np.fft.irfft(spectrum, fft_size)[:num_lags]
+    
+    # Energy of each reference window, from a running sum of squares
+    cumulative = np.concatenate(([0.0], np.cumsum(reference ** 2)))
+    window_energy = cumulative[n:n + num_lags] - cumulative[:num_lags]
+    
+    denominator = np.sqrt(np.maximum(window_energy, 1e-12) * max(np.dot(signal_data, signal_data), 1e-12))
+    scores = np.abs(raw) / denominator
+    best = int(np.argmax(scores))
+    return float(scores[best]), best - max_lag
+
 def analyze_audio_quality(audio_data, sample_rate=48000):
     """
     Analyze audio quality metrics
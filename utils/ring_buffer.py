@@ -0,0 +1,148 @@
+import threading
+import numpy as np
+
+class AudioRingBuffer:
+    """
+    Fixed-capacity float32 ring buffer with a read cursor.
+
+    Memory is allocated once; each write copies only the new frames and each
+    read copies only the frames it returns. Positions are absolute frame
+    counts, so `write_pos - read_pos` is always the number of unread frames.
+    If the reader falls more than `capacity` frames behind, the oldest unread
+    audio is overwritten and counted in `dropped_frames`.
+
+    Safe without a lock for exactly one writer thread and one reader thread:
+    the writer only advances `write_pos`, the reader only advances `read_pos`,
+    and a read that raced with an overwrite discards the clobbered frames.
+    The condition variable is only used to wake a waiting reader (or a writer
+    waiting for space); it is never held while audio is copied.
+    """
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.buffer = np.zeros(self.capacity, dtype=np.float32)
+        self.write_pos = 0
+        self.pending_pos = 0  # end of the write in progress, published before copying
+        self.read_pos = 0
+        self.dropped_frames = 0
+        self.closed = False
+        self._data_ready = threading.Condition()
+
+    def available(self):
+        """Number of frames written but not yet read."""
+        return min(self.write_pos - self.read_pos, self.capacity)
+
+    def write(self, frames):
+        """Append frames, overwriting the oldest audio once the buffer is full."""
+        frames = np.asarray(frames, dtype=np.float32).ravel()
+        n = len(frames)
+        if n == 0:
+            return
+
+        # Only the newest `capacity` frames can survive a single write
+        if n > self.capacity:
+            frames = frames[-self.capacity:]
+
+        # Announce the region about to be overwritten before touching it
+        self.pending_pos = self.write_pos + n
+        
+        start = (self.write_pos + n - len(frames)) % self.capacity
+        first = min(len(frames), self.capacity - start)
+        self.buffer[start:start + first] = frames[:first]
+        if first < len(frames):
+            self.buffer[:len(frames) - first] = frames[first:]
+
+        self.write_pos += n
+        
+        with self._data_ready:
+            self._data_ready.notify_all()
+
+    def peek(self, start, end):
+        """Copy frames at absolute positions [start, end) without consuming them.
+
+        Safe to call from a thread other than the reader. Frames that are not
+        (or no longer) held in the buffer come back as zeros.
+        """
+        data = np.zeros(max(0, end - start), dtype=np.float32)
+        low = max(start, self.write_pos - self.capacity)
+        high = min(end, self.write_pos)
+        if high <= low:
+            return data
+
+        first_index = low % self.capacity
+        first = min(high - low, self.capacity - first_index)
+        data[low - start:low - start + first] = self.buffer[first_index:first_index + first]
+        if first < high - low:
+            data[low - start + first:high - start] = self.buffer[:high - low - first]
+
+        # Zero out anything the writer overwrote while we were copying
+        clobbered_end = min(self.pending_pos - self.capacity, high)
+        if clobbered_end > low:
+            data[low - start:clobbered_end - start] = 0.0
+        return data
+
+    def skip(self, num_frames):
+        """Advance the read cursor without copying any audio."""
+        self.read_pos = min(self.read_pos + int(num_frames), self.write_pos)
+
+    def wait_for_frames(self, num_frames, timeout=None):
+        """Block until num_frames frames are unread or the buffer is closed.
+
+        Returns True if the frames are available.
+        """
+        with self._data_ready:
+            self._data_ready.wait_for(
+                lambda: self.closed or self.available() >= num_frames, timeout
+            )
+        return self.available() >= num_frames
+
+    def wait_for_space(self, num_frames, timeout=None):
+        """Block until num_frames frames can be written without overwriting unread
+        audio, or the buffer is closed. Returns True if there is room.
+        """
+        with self._data_ready:
+            self._data_ready.wait_for(
+                lambda: self.closed or self.capacity - self.available() >= num_frames, timeout
+            )
+        return self.capacity - self.available() >= num_frames
+
+    def close(self):
+        """Wake any waiting reader; no more frames will be written."""
+        with self._data_ready:
+            self.closed = True
+            self._data_ready.notify_all()
+
+    def read(self, num_frames):
+        """Consume up to num_frames frames and return them as a new array."""
+        write_pos = self.write_pos
+        
+        # Skip audio that has already been overwritten
+        oldest = write_pos - self.capacity
+        if self.read_pos < oldest:
+            self.dropped_frames += oldest - self.read_pos
+            self.read_pos = oldest
+
+        num_frames = min(int(num_frames), write_pos - self.read_pos)
+        if num_frames <= 0:
+            return np.zeros(0, dtype=np.float32)
+
+        read_start = self.read_pos
+        start = read_start % self.capacity
+        first = min(num_frames, self.capacity - start)
+        if first == num_frames:
+            data = self.buffer[start:start + num_frames].copy()
+        else:
+            data = np.concatenate((self.buffer[start:], self.buffer[:num_frames - first]))
+
+        # The writer may have lapped us while we were copying
+        clobbered = self.pending_pos - self.capacity - read_start
+        if clobbered > 0:
+            clobbered = min(clobbered, num_frames)
+            self.dropped_frames += clobbered
+            data = data[clobbered:]
+
+        self.read_pos = read_start + num_frames
+        
+        # Wake a writer waiting for room
+        with self._data_ready:
+            self._data_ready.notify_all()
+        return data